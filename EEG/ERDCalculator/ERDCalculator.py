@@ -1,5 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import numpy as np
-from scipy.signal import butter, filtfilt, welch
+from scipy.signal import butter, get_window, sosfilt_zi, sosfiltfilt, welch
+from ERDCalculator.erd_kernels import NUMBA_AVAILABLE, band_power_batch, bandpass_erd_batch, moving_window_erd, moving_window_erd_batch
+
+
+@lru_cache(maxsize=32)
+def _bandpass_filter(low, high, fs, order=5):
+    """
+    Design the bandpass filter once per (low, high, fs, order).
+
+    Returns:
+        tuple: (sos, float32 sos, sosfilt_zi state, sosfiltfilt padlen). The arrays are shared
+               between ERDCalculator instances and must not be modified. Only zi is marked
+               read-only: scipy's sosfilt needs writable coefficient buffers.
+    """
+    sos = butter(order, [low, high], btype='band', fs=fs, output='sos')
+    sos32 = sos.astype(np.float32)
+    zi = sosfilt_zi(sos)
+    zi.setflags(write=False)
+    padlen = 3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum()))
+    return sos, sos32, zi, int(padlen)
+
+
+# Epoch blocks are sized so one block's float32 samples fit in about 1 MB of cache:
+# the filter, squaring and reduction (or Welch segments) of a block then stay in cache
+# instead of streaming the whole stack through DRAM once per pass
+_BLOCK_BYTES = 1 << 20
+
+# Below this many epochs the blocks run serially: dispatching them to threads costs more
+# than it saves
+_THREAD_MIN_EPOCHS = 256
+
+
+@lru_cache(maxsize=32)
+def _welch_window(nperseg):
+    """
+    Hann window that scipy's welch builds by default, cached per segment length.
+    """
+    window = get_window('hann', nperseg)
+    window.setflags(write=False)
+    return window
+
 
 class ERDCalculator:
     """
@@ -8,7 +51,7 @@ class ERDCalculator:
     This version consolidates redundant methods and abstracts common processing steps
     to improve clarity, reduce code duplication, and enhance maintainability.
     """
-    def __init__(self, sampling_freq, epoch_pre_stimulus_seconds, epoch_post_stimulus_seconds, bandpass_low, bandpass_high, channel_names, focus_channels_indices, focus_stimuli=None):
+    def __init__(self, sampling_freq, epoch_pre_stimulus_seconds, epoch_post_stimulus_seconds, bandpass_low, bandpass_high, channel_names, focus_channels_indices, focus_stimuli=None, n_threads=1):
         """
         Initializes the ERDCalculator with necessary parameters.
         """
@@ -17,8 +60,9 @@ class ERDCalculator:
         self.samples_after_marker = int(epoch_post_stimulus_seconds * sampling_freq)
         self.epoch_total_samples = self.samples_before_marker + self.samples_after_marker
 
-        # Pre-compile the bandpass filter coefficients
-        self.b, self.a = butter(5, [bandpass_low, bandpass_high], btype='band', fs=sampling_freq)
+        # Pre-compile the bandpass filter as second-order sections (numerically stable, batchable),
+        # with the initial state and padding that sosfiltfilt uses, for the fused Numba kernel
+        self.sos, self.sos32, self.sos_zi, self.sos_padlen = _bandpass_filter(bandpass_low, bandpass_high, sampling_freq)
 
         self.channel_names = channel_names
         self.channel_count = len(channel_names)
@@ -26,6 +70,8 @@ class ERDCalculator:
         self.bandpass_low = bandpass_low
         self.bandpass_high = bandpass_high
         self.focus_stimuli = focus_stimuli
+        # Threads for the blocked batch paths; SciPy's filter and FFT release the GIL
+        self.n_threads = n_threads
 
     def _preprocess_epoch(self, epoch_data):
         """
@@ -43,13 +89,93 @@ class ERDCalculator:
         #     print(f"Epoch data invalid. Shape: {epoch_data.shape}, Expected: ({self.channel_count}, {self.epoch_total_samples})")
         #     return None
 
-        # 2. Apply the bandpass filter
-        filtered_epoch = filtfilt(self.b, self.a, epoch_data, axis=1)
+        return self.preprocess_epochs(epoch_data)
+
+    def preprocess_epochs(self, epochs):
+        """
+        Bandpass filter and apply CAR to one epoch (n_channels, n_samples) or a stack of
+        epochs (n_epochs, n_channels, n_samples) in a single vectorized call.
+        """
+        # Apply the bandpass filter along the time axis. float32 epochs are filtered with
+        # float32 coefficients so the filtered copy stays at half the memory traffic.
+        sos = self.sos32 if epochs.dtype == np.float32 else self.sos
+        filtered = sosfiltfilt(sos, epochs, axis=-1)
+
+        # Apply Common Average Reference (CAR) across channels
+        filtered -= np.mean(filtered, axis=-2, keepdims=True)
+
+        return filtered
 
-        # 3. Apply Common Average Reference (CAR)
-        filtered_epoch -= np.mean(filtered_epoch, axis=0, keepdims=True)
+    def _epoch_blocks(self, epochs):
+        """
+        Private helper splitting the epoch axis into cache-sized slices (see _BLOCK_BYTES).
+        """
+        n_epochs = len(epochs)
+        block = max(1, _BLOCK_BYTES // max(1, epochs[0].size * 4)) if n_epochs else 1
+        return [slice(start, start + block) for start in range(0, n_epochs, block)]
 
-        return filtered_epoch
+    def _for_each_block(self, epochs, func):
+        """
+        Private helper calling func(block) for every epoch block, spread over n_threads
+        threads for large stacks. func must only write to its own block of the outputs.
+        """
+        blocks = self._epoch_blocks(epochs)
+        if self.n_threads > 1 and len(epochs) > _THREAD_MIN_EPOCHS and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+                list(executor.map(func, blocks))
+        else:
+            for block in blocks:
+                func(block)
+
+    def _blocked_band_power(self, epochs):
+        """
+        Private helper: filter, square and average the epochs block by block, returning
+        mean pre and post-stimulus power (n_epochs, n_channels) without a full filtered copy.
+        """
+        pre_power = np.empty(epochs.shape[:2])
+        post_power = np.empty(epochs.shape[:2])
+
+        def band_power_block(block):
+            # Each filtered block is private to this call, so it is squared in place.
+            # Blocks may run on threads, so they use the serial kernel
+            pre_power[block], post_power[block] = self._band_power_batch(self.preprocess_epochs(epochs[block]), in_place=True)
+
+        self._for_each_block(epochs, band_power_block)
+        return pre_power, post_power
+
+    def _welch(self, data):
+        """
+        Private helper running scipy's welch along the last axis with the cached default window.
+        """
+        # Same segment length welch picks by default (256, or the whole signal if shorter)
+        window = _welch_window(min(256, data.shape[-1]))
+        return welch(data, fs=self.sampling_freq, window=window, axis=-1)
+
+    def _mean_focus_erd(self, erd_all_channels):
+        """
+        Private helper to average per-channel ERD (n_epochs, n_channels) over the focus
+        channels, giving NaN for epochs without any defined focus value.
+        """
+        erd_focus_values = erd_all_channels[:, self.focus_channels_indices]
+        erd_means = np.full(len(erd_all_channels), np.nan)
+        has_value = np.any(~np.isnan(erd_focus_values), axis=1)
+        erd_means[has_value] = np.nanmean(erd_focus_values[has_value], axis=1)
+        return erd_means
+
+    def _band_power_batch(self, processed, in_place=False, parallel=False):
+        """
+        Private helper returning mean pre and post-stimulus power (n_epochs, n_channels)
+        of preprocessed epochs. With in_place=True the NumPy fallback squares the epochs in
+        their own buffer (for filtered copies nobody else holds). parallel selects the
+        multi-threaded Numba kernel.
+        """
+        if NUMBA_AVAILABLE:
+            # One pass summing squares, with no squared copy
+            return band_power_batch(processed, self.samples_before_marker, parallel=parallel)
+        power = np.square(processed, out=processed) if in_place else processed ** 2
+        pre_power = np.nanmean(power[..., :self.samples_before_marker], axis=-1)
+        post_power = np.nanmean(power[..., self.samples_before_marker:], axis=-1)
+        return pre_power, post_power
 
     def _compute_erd_percentage(self, pre_power, post_power):
         """
@@ -120,6 +246,35 @@ class ERDCalculator:
         else:
             return {self.channel_names[i]: erd_percent_all_channels[i] for i in range(len(erd_percent_all_channels))}
 
+    def calculate_erd_from_bandpass_batch(self, epochs, processed=None, parallel=False):
+        """
+        Batched version of calculate_erd_from_bandpass(return_mean=True) for a stack of
+        epochs, filtering all of them with one sosfiltfilt call.
+
+        Args:
+            epochs (np.array): Stacked epochs. Shape: (n_epochs, n_channels, n_samples)
+            processed (np.array, optional): The same epochs already passed through
+                                            preprocess_epochs, to skip filtering.
+            parallel (bool): Run the Numba kernels across epochs on several threads.
+
+        Returns:
+            np.array: Mean focus-channel ERD per epoch (NaN where it cannot be computed).
+        """
+        if processed is None:
+            if NUMBA_AVAILABLE:
+                return bandpass_erd_batch(epochs, self.sos, self.sos_zi, self.sos_padlen,
+                                          self.samples_before_marker, self.focus_channels_indices, parallel)
+            pre_power, post_power = self._blocked_band_power(epochs)
+        else:
+            # Power for pre and post stimulus periods: (n_epochs, n_channels)
+            pre_power, post_power = self._band_power_batch(processed, parallel=parallel)
+
+        erd_percent = np.full(pre_power.shape, np.nan)
+        non_zero = pre_power != 0
+        erd_percent[non_zero] = (post_power[non_zero] - pre_power[non_zero]) / pre_power[non_zero] * 100
+
+        return self._mean_focus_erd(erd_percent)
+
     def calculate_erd_from_welch(self, epoch_data, return_mean=False):
         """
         Calculates ERD using Welch's method for power spectral density estimation.
@@ -141,8 +296,8 @@ class ERDCalculator:
         post_stimulus_data = epoch_data[:, self.samples_before_marker:]
 
         # Calculate power spectral density using Welch's method
-        f_pre, pxx_pre = welch(pre_stimulus_data, fs=self.sampling_freq, axis=1)
-        f_post, pxx_post = welch(post_stimulus_data, fs=self.sampling_freq, axis=1)
+        f_pre, pxx_pre = self._welch(pre_stimulus_data)
+        f_post, pxx_post = self._welch(post_stimulus_data)
 
         # Find frequency indices for the band of interest
         band_indices = (f_pre >= self.bandpass_low) & (f_pre <= self.bandpass_high)
@@ -168,6 +323,47 @@ class ERDCalculator:
                 return None
             return {self.channel_names[i]: erd_percent_all_channels[i] for i in range(len(self.channel_names))}
 
+    def calculate_erd_from_welch_batch(self, epochs):
+        """
+        Batched version of calculate_erd_from_welch(return_mean=True) for a stack of epochs.
+        Cache-sized blocks of epochs go through one welch call per period, so the FFTs run
+        as vectorized batches instead of one scipy call per epoch.
+
+        Args:
+            epochs (np.array): Stacked epochs. Shape: (n_epochs, n_channels, n_samples)
+
+        Returns:
+            np.array or None: Mean focus-channel ERD per epoch (NaN where it cannot be
+                              computed), or None if the input or band is invalid.
+        """
+        if epochs.shape[1:] != (self.channel_count, self.epoch_total_samples):
+            print(f"Epoch data invalid. Shape: {epochs.shape[1:]}, Expected: ({self.channel_count}, {self.epoch_total_samples})")
+            return None
+
+        # Frequencies of the pre-stimulus welch output (same segment length as _welch)
+        f_pre = np.fft.rfftfreq(min(256, self.samples_before_marker), d=1 / self.sampling_freq)
+        band_indices = (f_pre >= self.bandpass_low) & (f_pre <= self.bandpass_high)
+        if not np.any(band_indices):
+            print("Invalid frequency band. Please check bandpass frequencies.")
+            return None
+
+        # Average power within the band: (n_epochs, n_channels)
+        pre_power = np.empty(epochs.shape[:2])
+        post_power = np.empty(epochs.shape[:2])
+
+        def welch_block(block):
+            _, pxx_pre = self._welch(epochs[block, :, :self.samples_before_marker])
+            _, pxx_post = self._welch(epochs[block, :, self.samples_before_marker:])
+            pre_power[block] = np.nanmean(pxx_pre[..., band_indices], axis=-1)
+            post_power[block] = np.nanmean(pxx_post[..., band_indices], axis=-1)
+
+        self._for_each_block(epochs, welch_block)
+
+        erd_percent = np.full(pre_power.shape, np.nan)
+        non_zero = pre_power != 0
+        erd_percent[non_zero] = (post_power[non_zero] - pre_power[non_zero]) / pre_power[non_zero] * 100
+
+        return self._mean_focus_erd(erd_percent)
 
     def calculate_erd_from_db_correction(self, epoch_data, return_mean=False):
         """
@@ -225,7 +421,35 @@ class ERDCalculator:
         else:
             return {self.channel_names[i]: erd_db_all_channels[i] for i in range(len(erd_db_all_channels))}
 
-    def calculate_erd_moving_average(self, epoch_data, window_size_samples, return_mean=True, method='percentage'):
+    def calculate_erd_from_db_correction_batch(self, epochs, processed=None, parallel=False):
+        """
+        Batched version of calculate_erd_from_db_correction(return_mean=True) for a stack of epochs.
+
+        Args:
+            epochs (np.array): Stacked epochs. Shape: (n_epochs, n_channels, n_samples)
+            processed (np.array, optional): The same epochs already passed through
+                                            preprocess_epochs, to skip filtering.
+            parallel (bool): Run the Numba kernel across epochs on several threads.
+
+        Returns:
+            np.array: Mean focus-channel ERD (dB) per epoch (NaN where it cannot be computed).
+        """
+        if processed is None:
+            baseline_power, activation_power = self._blocked_band_power(epochs)
+        else:
+            baseline_power, activation_power = self._band_power_batch(processed, parallel=parallel)
+
+        # Only positive baseline power and positive ratios give a defined dB value
+        erd_db = np.full(baseline_power.shape, np.nan)
+        valid = baseline_power > 0
+        ratio = np.full(baseline_power.shape, np.nan)
+        ratio[valid] = activation_power[valid] / baseline_power[valid]
+        valid_ratio = ratio > 0
+        erd_db[valid_ratio] = 10 * np.log10(ratio[valid_ratio])
+
+        return self._mean_focus_erd(erd_db)
+
+    def calculate_erd_moving_average(self, epoch_data, window_size_samples, return_mean=True, method='percentage', preprocessed=False):
         """
         Calculates ERD using a moving average approach with a selectable calculation method.
 
@@ -236,13 +460,14 @@ class ERDCalculator:
                                 If False, returns a dict of ERD values per focus channel.
             method (str): The calculation method to use. Options: 'percentage', 'db'.
                           Defaults to 'percentage'.
+            preprocessed (bool): If True, epoch_data has already been filtered and re-referenced.
 
         Returns:
             tupple or dict: A tuple containing the mean ERD value and the moving average ERD values for focus channels,
                             or a dict of ERD values per focus channel if return_mean is False.
             float, dict, or None: The calculated ERD value(s) or None if calculation fails.
         """
-        processed_epoch = self._preprocess_epoch(epoch_data)
+        processed_epoch = epoch_data if preprocessed else self._preprocess_epoch(epoch_data)
         if processed_epoch is None:
             return None
 
@@ -259,22 +484,14 @@ class ERDCalculator:
             print("Not enough samples to form any full window pairs.")
             return None
 
-        all_window_erds = np.full((self.channel_count, num_windows), np.nan)
-
-        for i in range(num_windows):
-            pre_power = np.mean(pre_stimulus_data[:, i:i + window_size_samples]**2, axis=1)
-            post_power = np.mean(post_stimulus_data[:, i:i + window_size_samples]**2, axis=1)
-
-            # Select the calculation method based on the 'method' parameter
-            if method == 'percentage':
-                erd_window = self._compute_erd_percentage(pre_power, post_power)
-            elif method == 'db':
-                erd_window = self._compute_erd_db(pre_power, post_power)
-            else:
-                print(f"Invalid method '{method}'. Please choose 'percentage' or 'db'.")
-                return None
+        # Select the calculation method based on the 'method' parameter
+        if method not in ('percentage', 'db'):
+            print(f"Invalid method '{method}'. Please choose 'percentage' or 'db'.")
+            return None
 
-            all_window_erds[:, i] = erd_window
+        # Sliding-window power with running sums (Numba-compiled when available)
+        all_window_erds = moving_window_erd(processed_epoch, window_size_samples,
+                                            self.samples_before_marker, method == 'db')
 
         mean_erd_all_channels = np.nanmean(all_window_erds, axis=1)
         erd_focus_values = mean_erd_all_channels[self.focus_channels_indices]
@@ -288,6 +505,43 @@ class ERDCalculator:
         else:
             return {self.channel_names[i]: mean_erd_all_channels[i] for i in range(len(self.channel_names))}
 
+    def calculate_erd_moving_average_batch(self, epochs, window_size_samples, method='percentage', processed=None, parallel=False):
+        """
+        Batched version of calculate_erd_moving_average(return_mean=True) for a stack of epochs.
+
+        Args:
+            epochs (np.array): Stacked epochs. Shape: (n_epochs, n_channels, n_samples)
+            window_size_samples (int): The size of the moving window in samples.
+            method (str): The calculation method to use. Options: 'percentage', 'db'.
+            processed (np.array, optional): The same epochs already passed through
+                                            preprocess_epochs, to skip filtering.
+            parallel (bool): Run the Numba kernel across epochs on several threads.
+
+        Returns:
+            tuple or None: (mean focus-channel ERD per epoch, NaN where undefined;
+                            focus-channel moving average ERD curves, shape (n_epochs, num_windows)),
+                           or None if the window or method is invalid.
+        """
+        pre_len, post_len = self.samples_before_marker, self.samples_after_marker
+        if not (0 < window_size_samples <= pre_len and window_size_samples <= post_len):
+            print(f"Window size ({window_size_samples}) is invalid for pre ({pre_len}) or post ({post_len}) data lengths.")
+            return None
+
+        if method not in ('percentage', 'db'):
+            print(f"Invalid method '{method}'. Please choose 'percentage' or 'db'.")
+            return None
+
+        if processed is None:
+            processed = self.preprocess_epochs(epochs)
+
+        # (n_epochs, n_channels, num_windows)
+        all_window_erds = moving_window_erd_batch(processed, window_size_samples,
+                                                  self.samples_before_marker, method == 'db', parallel)
+
+        erd_means = self._mean_focus_erd(np.nanmean(all_window_erds, axis=-1))
+        erd_curves = all_window_erds[:, self.focus_channels_indices, :].mean(axis=1)
+        return erd_means, erd_curves
+
     def calculate_erd_across_trials(self, data_df, markers_df, subject_id=None):
         """
         Calculates average ERD/ERS across all trials for each stimulus type.
@@ -0,0 +1,301 @@
+import numpy as np
+
+# Numba is optional: without it the NumPy implementation below is used
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _moving_window_erd_numpy(processed_epoch, window, pre, use_db):
+    """
+    NumPy fallback for moving_window_erd(_batch): window power sums from cumulative sums of
+    squares along the last axis, for one epoch or a stack of epochs.
+    """
+    pre_data = processed_epoch[..., :pre]
+    post_data = processed_epoch[..., pre:]
+    num_windows = min(pre_data.shape[-1], post_data.shape[-1]) - window + 1
+
+    def window_power(data):
+        csum = np.concatenate((np.zeros(data.shape[:-1] + (1,)), np.cumsum(data ** 2, axis=-1, dtype=np.float64)), axis=-1)
+        return (csum[..., window:window + num_windows] - csum[..., :num_windows]) / window
+
+    pre_power = window_power(pre_data)
+    post_power = window_power(post_data)
+
+    erds = np.full(pre_power.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if use_db:
+            valid = (pre_power > 0) & (post_power > 0)
+            erds[valid] = 10 * np.log10(post_power[valid] / pre_power[valid])
+        else:
+            valid = pre_power != 0
+            erds[valid] = (post_power[valid] - pre_power[valid]) / pre_power[valid] * 100
+    return erds
+
+
+if NUMBA_AVAILABLE:
+    # No fastmath: the NaN markers for invalid windows must survive compilation.
+    # float32 epochs get their own specialization; the power sums still accumulate in float64.
+    # All kernels release the GIL (nogil) so the ERD methods can run on concurrent threads.
+    @njit(["float64[:, ::1](float32[:, ::1], int64, int64, boolean)",
+           "float64[:, ::1](float64[:, ::1], int64, int64, boolean)"], nogil=True, cache=True)
+    def _moving_window_erd_numba(processed_epoch, window, pre, use_db):
+        n_channels, n_samples = processed_epoch.shape
+        post_len = n_samples - pre
+        num_windows = min(pre, post_len) - window + 1
+        erds = np.empty((n_channels, num_windows))
+        for ch in range(n_channels):
+            x = processed_epoch[ch]
+            # Running sums of squares over the first pre and post windows
+            pre_sum = 0.0
+            post_sum = 0.0
+            for k in range(window):
+                pre_sum += x[k] * x[k]
+                post_sum += x[pre + k] * x[pre + k]
+            for i in range(num_windows):
+                if i > 0:
+                    old_pre = x[i - 1]
+                    new_pre = x[i + window - 1]
+                    old_post = x[pre + i - 1]
+                    new_post = x[pre + i + window - 1]
+                    pre_sum += new_pre * new_pre - old_pre * old_pre
+                    post_sum += new_post * new_post - old_post * old_post
+                pre_power = pre_sum / window
+                post_power = post_sum / window
+                if use_db:
+                    if pre_power > 0 and post_power > 0:
+                        erds[ch, i] = 10 * np.log10(post_power / pre_power)
+                    else:
+                        erds[ch, i] = np.nan
+                else:
+                    if pre_power != 0:
+                        erds[ch, i] = (post_power - pre_power) / pre_power * 100
+                    else:
+                        erds[ch, i] = np.nan
+        return erds
+
+    def _moving_window_erd_batch_impl(epochs, window, pre, use_db):
+        n_epochs, n_channels, n_samples = epochs.shape
+        num_windows = min(pre, n_samples - pre) - window + 1
+        erds = np.empty((n_epochs, n_channels, num_windows))
+        for n in prange(n_epochs):
+            erds[n] = _moving_window_erd_numba(epochs[n], window, pre, use_db)
+        return erds
+
+    # Serial and prange-parallel builds of the same batch loop; threads only pay off
+    # once there are enough epochs to amortize their startup
+    _moving_window_erd_batch_serial = njit(nogil=True, cache=True)(_moving_window_erd_batch_impl)
+    _moving_window_erd_batch_parallel = njit(parallel=True, nogil=True, cache=True)(_moving_window_erd_batch_impl)
+
+    # Bandpass ERD fused into one sweep per epoch: odd padding, forward/backward SOS
+    # filtering (the same steps as scipy's sosfiltfilt), CAR and the pre/post power sums.
+    # In the parallel build each thread only holds one filtered epoch at a time.
+    def _bandpass_erd_batch_impl(epochs, sos, zi, padlen, pre, focus_idx):
+        n_epochs, n_channels, n_samples = epochs.shape
+        n_sections = sos.shape[0]
+        ext_len = n_samples + 2 * padlen
+        erd_means = np.empty(n_epochs)
+        for n in prange(n_epochs):
+            filtered = np.empty((n_channels, n_samples))
+            ext = np.empty(ext_len)
+            state = np.empty((n_sections, 2))
+            for ch in range(n_channels):
+                x = epochs[n, ch]
+                # Odd extension of the signal at both ends
+                for k in range(padlen):
+                    ext[k] = 2 * x[0] - x[padlen - k]
+                    ext[padlen + n_samples + k] = 2 * x[n_samples - 1] - x[n_samples - 2 - k]
+                for k in range(n_samples):
+                    ext[padlen + k] = x[k]
+
+                # Forward pass (direct form II transposed, one biquad per section)
+                for s in range(n_sections):
+                    state[s, 0] = zi[s, 0] * ext[0]
+                    state[s, 1] = zi[s, 1] * ext[0]
+                for k in range(ext_len):
+                    v = ext[k]
+                    for s in range(n_sections):
+                        y = sos[s, 0] * v + state[s, 0]
+                        state[s, 0] = sos[s, 1] * v - sos[s, 4] * y + state[s, 1]
+                        state[s, 1] = sos[s, 2] * v - sos[s, 5] * y
+                        v = y
+                    ext[k] = v
+
+                # Backward pass
+                last = ext[ext_len - 1]
+                for s in range(n_sections):
+                    state[s, 0] = zi[s, 0] * last
+                    state[s, 1] = zi[s, 1] * last
+                for k in range(ext_len - 1, -1, -1):
+                    v = ext[k]
+                    for s in range(n_sections):
+                        y = sos[s, 0] * v + state[s, 0]
+                        state[s, 0] = sos[s, 1] * v - sos[s, 4] * y + state[s, 1]
+                        state[s, 1] = sos[s, 2] * v - sos[s, 5] * y
+                        v = y
+                    ext[k] = v
+
+                for k in range(n_samples):
+                    filtered[ch, k] = ext[padlen + k]
+
+            # Common Average Reference across channels
+            for k in range(n_samples):
+                car = 0.0
+                for ch in range(n_channels):
+                    car += filtered[ch, k]
+                car /= n_channels
+                for ch in range(n_channels):
+                    filtered[ch, k] -= car
+
+            # Percentage ERD per focus channel, averaged over the defined ones
+            erd_sum = 0.0
+            erd_count = 0
+            for f in range(focus_idx.shape[0]):
+                row = filtered[focus_idx[f]]
+                pre_power = 0.0
+                for k in range(pre):
+                    pre_power += row[k] * row[k]
+                post_power = 0.0
+                for k in range(pre, n_samples):
+                    post_power += row[k] * row[k]
+                pre_power /= pre
+                post_power /= n_samples - pre
+                if pre_power != 0:
+                    erd = (post_power - pre_power) / pre_power * 100
+                    if not np.isnan(erd):
+                        erd_sum += erd
+                        erd_count += 1
+            erd_means[n] = erd_sum / erd_count if erd_count > 0 else np.nan
+        return erd_means
+
+    # Serial and parallel builds, as for the moving window batch. Numba's default workqueue
+    # threading layer aborts when two threads launch parallel kernels at once, so only
+    # callers that opt in (and do not run kernels concurrently) get the prange build.
+    _bandpass_erd_batch_serial = njit(nogil=True, cache=True)(_bandpass_erd_batch_impl)
+    _bandpass_erd_batch_parallel = njit(parallel=True, nogil=True, cache=True)(_bandpass_erd_batch_impl)
+
+    # Mean squared amplitude of the pre and post periods per epoch and channel, skipping NaN
+    # samples like np.nanmean; squares are summed on the fly instead of into a squared copy
+    def _band_power_batch_impl(processed, pre, post_start):
+        n_epochs, n_channels, n_samples = processed.shape
+        pre_power = np.empty((n_epochs, n_channels))
+        post_power = np.empty((n_epochs, n_channels))
+        for n in prange(n_epochs):
+            for ch in range(n_channels):
+                x = processed[n, ch]
+                total = 0.0
+                count = 0
+                for k in range(pre):
+                    v = x[k]
+                    if not np.isnan(v):
+                        total += v * v
+                        count += 1
+                pre_power[n, ch] = total / count if count > 0 else np.nan
+                total = 0.0
+                count = 0
+                for k in range(post_start, n_samples):
+                    v = x[k]
+                    if not np.isnan(v):
+                        total += v * v
+                        count += 1
+                post_power[n, ch] = total / count if count > 0 else np.nan
+        return pre_power, post_power
+
+    _band_power_batch_serial = njit(nogil=True, cache=True)(_band_power_batch_impl)
+    _band_power_batch_parallel = njit(parallel=True, nogil=True, cache=True)(_band_power_batch_impl)
+
+
+def moving_window_erd(processed_epoch, window, pre, use_db):
+    """
+    ERD of every sliding window pair of a preprocessed epoch.
+
+    Window i compares the mean power of processed_epoch[:, i:i+window] (baseline)
+    with processed_epoch[:, pre+i:pre+i+window] (activation), for all windows that
+    fit in both periods.
+
+    Args:
+        processed_epoch (np.array): Filtered epoch, shape (n_channels, n_samples), float32 or float64.
+        window (int): Window size in samples.
+        pre (int): Number of pre-stimulus samples.
+        use_db (bool): dB ERD if True, percentage ERD otherwise.
+
+    Returns:
+        np.array: ERD per channel and window, shape (n_channels, num_windows);
+                  NaN where the power makes the ERD undefined.
+    """
+    if processed_epoch.dtype != np.float32:
+        processed_epoch = processed_epoch.astype(np.float64, copy=False)
+    processed_epoch = np.ascontiguousarray(processed_epoch)
+    if NUMBA_AVAILABLE:
+        return _moving_window_erd_numba(processed_epoch, window, pre, use_db)
+    return _moving_window_erd_numpy(processed_epoch, window, pre, use_db)
+
+
+def moving_window_erd_batch(epochs, window, pre, use_db, parallel=False):
+    """
+    moving_window_erd for a stack of preprocessed epochs in a single call.
+
+    Args:
+        epochs (np.array): Filtered epochs, shape (n_epochs, n_channels, n_samples), float32 or float64.
+        window (int): Window size in samples.
+        pre (int): Number of pre-stimulus samples.
+        use_db (bool): dB ERD if True, percentage ERD otherwise.
+        parallel (bool): Spread the epochs over threads (Numba only).
+
+    Returns:
+        np.array: ERD per epoch, channel and window, shape (n_epochs, n_channels, num_windows).
+    """
+    if epochs.dtype != np.float32:
+        epochs = epochs.astype(np.float64, copy=False)
+    epochs = np.ascontiguousarray(epochs)
+    if NUMBA_AVAILABLE:
+        kernel = _moving_window_erd_batch_parallel if parallel else _moving_window_erd_batch_serial
+        return kernel(epochs, window, pre, use_db)
+    return _moving_window_erd_numpy(epochs, window, pre, use_db)
+
+
+def bandpass_erd_batch(epochs, sos, zi, padlen, pre, focus_idx, parallel=False):
+    """
+    Mean focus-channel bandpass ERD (percentage) of every epoch in one fused pass.
+
+    Only available with Numba; callers fall back to the sosfiltfilt path otherwise.
+
+    Args:
+        epochs (np.array): Raw epochs, shape (n_epochs, n_channels, n_samples).
+        sos (np.array): Bandpass filter second-order sections.
+        zi (np.array): Filter initial state per unit input, from scipy's sosfilt_zi.
+        padlen (int): Odd-extension length used by sosfiltfilt for this filter.
+        pre (int): Number of pre-stimulus samples.
+        focus_idx (np.array): Indices of the focus channels.
+        parallel (bool): Spread the epochs over threads.
+
+    Returns:
+        np.array: Mean focus-channel ERD per epoch (NaN where it cannot be computed).
+    """
+    kernel = _bandpass_erd_batch_parallel if parallel else _bandpass_erd_batch_serial
+    return kernel(np.ascontiguousarray(epochs), sos, zi, padlen, pre, np.asarray(focus_idx, dtype=np.int64))
+
+
+def band_power_batch(processed, pre, post_start=None, parallel=False):
+    """
+    Mean pre and post-stimulus power of every channel of a stack of preprocessed epochs.
+
+    Only available with Numba; callers fall back to NumPy otherwise.
+
+    Args:
+        processed (np.array): Filtered epochs, shape (n_epochs, n_channels, n_samples), float32 or float64.
+        pre (int): Number of pre-stimulus samples.
+        post_start (int, optional): First post-stimulus sample; defaults to pre.
+        parallel (bool): Spread the epochs over threads.
+
+    Returns:
+        tuple: (pre_power, post_power), each of shape (n_epochs, n_channels); NaN samples are ignored.
+    """
+    if processed.dtype != np.float32:
+        processed = processed.astype(np.float64, copy=False)
+    if post_start is None:
+        post_start = pre
+    kernel = _band_power_batch_parallel if parallel else _band_power_batch_serial
+    return kernel(np.ascontiguousarray(processed), pre, post_start)
@@ -4,18 +4,28 @@ import random          # For randomizing trial conditions and timing variations
 import time            # For timestamping and timing operations
 import sys             # For system-level operations like exit
 import os              # For environment variable access
-import queue           # For potential future data queuing (currently unused)
+import queue           # For handing triggers to the serial worker thread
+import threading       # For the background serial trigger worker
+import numpy as np     # For precomputing per-trial randomized timings
+from typing import NamedTuple  # For the immutable color table
+from enum import IntEnum       # For integer condition codes
 
 # Import custom utility modules for experiment functionality
 from utils.trial_generator import TrialGenerator              # Generates randomized trial sequences
 from utils.pygame_display import PygameDisplay               # Handles all visual display operations
 from utils.logger import TrialDataLogger                     # Logs experimental data to CSV files
 from utils.serial_communication import SerialCommunication   # Sends EEG triggers via serial port
-from utils.logger import TextLogger                          # Logs text-based experimental events
+from utils.logger import BufferedTextLogger                  # Logs text-based experimental events off the display thread
 from dotenv import load_dotenv                               # Loads environment variables from .env file
 import platform                                              # For cross-platform compatibility
 import subprocess                                            # For system audio commands
 
+# Optional sample-clock scheduled audio (PortAudio via sounddevice/rtmixer)
+try:
+    import rtmixer
+except ImportError:
+    rtmixer = None
+
 #import finger functions
 import finger_controller as fc
 
@@ -46,6 +56,112 @@ def cross_platform_beep(frequency=1000, duration_ms=100):
         print(f"BEEP! ({frequency}Hz, {duration_ms}ms) - Audio error: {e}")
 
 
+def build_beep_sound(frequency=1000, duration_ms=100, volume=0.5):
+    """
+    Synthesize a sine beep as a preloaded pygame Sound.
+
+    Playing a preloaded Sound is a non-blocking native call, unlike
+    cross_platform_beep which spawns a system process on every trial.
+    Requires pygame.mixer to be initialized.
+
+    Args:
+        frequency: Frequency in Hz (default: 1000)
+        duration_ms: Duration in milliseconds (default: 100)
+        volume: Amplitude as a fraction of full scale (default: 0.5)
+
+    Returns:
+        pygame.mixer.Sound: The synthesized beep
+    """
+    sample_rate, _, channels = pygame.mixer.get_init()
+    t = np.arange(int(sample_rate * duration_ms / 1000)) / sample_rate
+    samples = (volume * 32767 * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+    if channels > 1:
+        # The mixer may have opened the device with more channels than requested
+        samples = np.repeat(samples[:, None], channels, axis=1)
+    return pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+
+
+def set_realtime_priority():
+    """
+    Reduce scheduler-induced timing jitter for the experiment process.
+
+    Linux: pins the process to a single core (EXP_CPU environment variable, default 3;
+    best combined with the isolcpus=<core> kernel boot parameter) and switches to
+    SCHED_FIFO priority 80, which needs root or CAP_SYS_NICE.
+    Windows: raises the process priority class and the main thread priority.
+    Any step that is not permitted is skipped with a warning. Call this before starting
+    worker threads so they inherit the affinity and scheduling policy.
+    """
+    system = platform.system()
+    if system == "Linux":
+        cpu = int(os.environ.get("EXP_CPU", "3"))
+        try:
+            if cpu in os.sched_getaffinity(0):
+                os.sched_setaffinity(0, {cpu})
+                print(f"Pinned experiment process to CPU {cpu}.")
+            else:
+                print(f"Warning: CPU {cpu} is not available; CPU affinity unchanged.")
+        except (AttributeError, OSError) as e:
+            print(f"Warning: Could not set CPU affinity ({e}).")
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(80))
+            print("Using SCHED_FIFO real-time scheduling (priority 80).")
+        except (AttributeError, OSError) as e:
+            print(f"Warning: Could not enable SCHED_FIFO scheduling ({e}).")
+    elif system == "Windows":
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            HIGH_PRIORITY_CLASS = 0x00000080
+            THREAD_PRIORITY_TIME_CRITICAL = 15
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), HIGH_PRIORITY_CLASS)
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_TIME_CRITICAL)
+            print("Raised experiment process and thread priority.")
+        except Exception as e:
+            print(f"Warning: Could not raise process priority ({e}).")
+
+
+class _Colors(NamedTuple):
+    """RGB color tuples for the UI elements."""
+    WHITE: tuple = (255, 255, 255)
+    BLACK: tuple = (0, 0, 0)
+    GRAY: tuple = (150, 150, 150)
+    RED: tuple = (255, 0, 0)
+    BLUE: tuple = (0, 0, 255)
+    CIRCLE_COLOR: tuple = (200, 200, 200)
+
+
+COLORS = _Colors()
+
+
+class CondCode(IntEnum):
+    """
+    Integer code of every stimulus condition. Motor execution ("_blue") variants are
+    offset by BLUE_OFFSET from their motor imagery counterparts, so per-trial lookups
+    of triggers and surfaces are plain list indexing.
+    """
+    THUMB = 0
+    INDEX = 1
+    MIDDLE = 2
+    RING = 3
+    PINKY = 4
+    SIXTH = 5
+    THUMB_B = 6
+    INDEX_B = 7
+    MIDDLE_B = 8
+    RING_B = 9
+    PINKY_B = 10
+    SIXTH_B = 11
+    BLANK = 12
+
+
+BLUE_OFFSET = CondCode.THUMB_B - CondCode.THUMB
+
+# Condition name for each code, e.g. COND_NAMES[CondCode.SIXTH_B] == "sixth_blue"
+COND_NAMES = tuple(code.name.lower().replace("_b", "_blue") for code in CondCode)
+COND_CODE_OF = {name: CondCode(code) for code, name in enumerate(COND_NAMES)}
+
+
 # --- Configuration Class ---
 class ExperimentConfig:
     """
@@ -60,14 +176,9 @@ class ExperimentConfig:
         self.FULLSCREEN_MODE = True  # Set to True for fullscreen mode
 
         # === COLOR DEFINITIONS ===
-        # RGB color tuples for various UI elements
-        self.WHITE = (255, 255, 255)
-        self.BLACK = (0, 0, 0)
-        self.GRAY = (150, 150, 150)
-        self.RED = (255, 0, 0)
-        self.BLUE = (0, 0, 255)
-        self.RED = (255, 0, 0)  # Note: This is a duplicate, may need cleanup
-        self.CIRCLE_COLOR = (200, 200, 200)
+        # RGB color tuples for various UI elements, shared and immutable.
+        # Still readable as config.WHITE etc. through __getattr__ below.
+        self.colors = COLORS
 
         # === TIMING CONFIGURATION (all in milliseconds) ===
         # Control whether intro waits for key press or auto-advances
@@ -180,6 +291,11 @@ class ExperimentConfig:
         # Settings for beep sounds that indicate trial start
         self.BEEP_FREQUENCY = 1000  # Frequency in Hz
         self.BEEP_DURATION_MS = 100  # Duration in milliseconds
+        # With rtmixer installed, beeps are scheduled this far ahead on the audio sample clock
+        # so their onset is deterministic; otherwise pygame.mixer plays them immediately
+        self.BEEP_SCHEDULE_DELAY_S = 0.01
+        self.AUDIO_SAMPLE_RATE = 48000
+        self.AUDIO_BLOCK_SIZE = 64
         
         # === PARTICIPANT RESPONSE TRIGGERS ===
         # Triggers for yes/no questionnaire responses
@@ -207,6 +323,23 @@ class ExperimentConfig:
             "pinky_blue": self.TRIGGER_PINKY_ONSET_BLUE,
         }
 
+        # Single-byte serial payloads, built once so no int-to-bytes conversion happens per trigger
+        self.STIMULUS_TRIGGER_BYTES = {name: bytes([code]) for name, code in self.STIMULUS_TRIGGER_MAP.items()}
+        # Same payloads indexed by CondCode (None for a condition without a trigger)
+        self.TRIGGER_BYTES_BY_CODE = [self.STIMULUS_TRIGGER_BYTES.get(name) for name in COND_NAMES]
+        self.TRIGGER_FIXATION_ONSET_BYTES = bytes([self.TRIGGER_FIXATION_ONSET])
+        self.TRIGGER_BLOCK_START_BYTES = bytes([self.TRIGGER_BLOCK_START])
+        self.TRIGGER_BLOCK_END_BYTES = bytes([self.TRIGGER_BLOCK_END])
+        self.YES_TRIGGER_BYTES = bytes([self.YES_TRIGGER])
+        self.NO_TRIGGER_BYTES = bytes([self.NO_TRIGGER])
+
+    def __getattr__(self, name):
+        # Flat access to the color table (config.WHITE, config.RED, ...), as used by PygameDisplay
+        colors = self.__dict__.get("colors")
+        if colors is not None and name in _Colors._fields:
+            return getattr(colors, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
 # --- Main Experiment Class ---
 class Experiment:
     """
@@ -223,40 +356,192 @@ class Experiment:
 
         # Load configuration settings
         self.config = ExperimentConfig()
+
+        # Pin to a core and raise scheduling priority before any worker thread is started
+        set_realtime_priority()
         
+        # Request a mono, small-buffer mixer before pygame.init() runs in PygameDisplay
+        # so the beep starts with minimal latency
+        pygame.mixer.pre_init(44100, -16, 1, 256)
+
         # Initialize display system for presenting stimuli and instructions
         self.display = PygameDisplay(self.config)
+
+        # Only quit and key events are ever handled; block the rest (mouse motion, window
+        # events) at the SDL level so they never reach the Python-side event queue
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN])
+
+        # Preload the trial-start beep: rtmixer if available, else pygame.mixer,
+        # else fall back to the system beep if no audio device
+        self._mixer = None
+        self._beep = None
+        self._beep_actions = []
+        if rtmixer is not None:
+            try:
+                self._mixer = rtmixer.Mixer(channels=1, samplerate=self.config.AUDIO_SAMPLE_RATE,
+                                            blocksize=self.config.AUDIO_BLOCK_SIZE)
+                self._mixer.start()
+                t = np.arange(int(self.config.AUDIO_SAMPLE_RATE * self.config.BEEP_DURATION_MS / 1000)) / self.config.AUDIO_SAMPLE_RATE
+                self._beep_buffer = (0.5 * np.sin(2 * np.pi * self.config.BEEP_FREQUENCY * t)).astype(np.float32)
+            except Exception as e:
+                print(f"Warning: Could not start rtmixer ({e}). Using pygame mixer.")
+                self._mixer = None
+        if self._mixer is None:
+            try:
+                pygame.mixer.init()
+                self._beep = build_beep_sound(self.config.BEEP_FREQUENCY, self.config.BEEP_DURATION_MS)
+            except Exception as e:
+                print(f"Warning: Could not initialize pygame mixer ({e}). Using system beep.")
+                self._beep = None
         
         # Initialize serial communication for EEG trigger transmission
         self.serial_comm = SerialCommunication(self.config.SERIAL_PORT, self.config.BAUD_RATE)
         
+        # Serial writes run on a background thread so USB latency spikes never delay a blit.
+        # Each entry of trigger_timestamps is (code, queued_ns, sent_ns) from perf_counter_ns.
+        self._trigger_q = queue.SimpleQueue()
+        self.trigger_timestamps = []
+        self._trigger_thread = threading.Thread(target=self._trigger_worker, daemon=True)
+        self._trigger_thread.start()
+        
         # Initialize trial generator for creating randomized trial sequences
         self.trial_generator = TrialGenerator(self.config)
+
+        # Category of every condition code (motor execution variants share their finger's category)
+        self._cat_of = [self.trial_generator.get_condition_category(name[:-len("_blue")] if name.endswith("_blue") else name)
+                        for name in COND_NAMES]
         
         # CSV data logger removed as per user request (empty files not needed)
         
-        # Initialize text logger for logging experimental events
-        self.logger = TextLogger(filename="assessment_log.txt")
+        # Initialize text logger for logging experimental events; its writer thread also
+        # handles console echo, so neither print nor file I/O runs between trials
+        self.logger = BufferedTextLogger(filename="assessment_log.txt")
         
         # Generate unique participant ID (3-digit random number with 'P' prefix)
         self.participant_id = "P" + str(random.randint(100, 999))
+
+        # Per-participant RNG so randomized orderings can be reproduced from the participant ID
+        self._rng = np.random.default_rng(seed=int(self.participant_id[1:]))
+
+        # Precompute the jittered fixation duration (FIX-500 or FIX+500 ms) for every trial
+        # of the session in one vectorized draw, so no RNG call happens inside a trial.
+        # Motor execution trials use the first len(NORMAL_FINGER_TYPES)+1 entries,
+        # motor imagery trials the remaining ones.
+        self._num_motor_execution_trials = len(self.config.NORMAL_FINGER_TYPES) + 1
+        total_trials = self.config.NUM_BLOCKS * self.config.TRIALS_PER_BLOCK + self._num_motor_execution_trials
+        self._fixation_schedule = (self.config.FIXATION_IN_TRIAL_DURATION_MS - 500) + 1000 * self._rng.integers(
+            0, 2, size=total_trials, dtype=np.int32
+        )
         
         # Initialize placeholder for future features
         self.er_data_queue = queue.Queue()  # For potential future ER data reception
         self.tcp_client = None  # Placeholder for TCP client communication
 
+        # Config constants read on every trial, cached as direct attributes
+        c = self.config
+        self._T_FIX = c.TRIGGER_FIXATION_ONSET_BYTES
+        self._IMG_MS = c.IMAGE_DISPLAY_DURATION_MS
+        self._SHORT_BREAK_MS = c.SHORT_BREAK_DURATION_MS
+        self._BEEP_F = c.BEEP_FREQUENCY
+        self._BEEP_D = c.BEEP_DURATION_MS
+        self._BEEP_DELAY_S = c.BEEP_SCHEDULE_DELAY_S
+
     def _close_all_connections(self):
         """
         Safely close all hardware connections and communication channels.
         Called during experiment cleanup to prevent resource leaks.
         """
+        # Drain pending triggers before closing the serial port
+        if self._trigger_thread.is_alive():
+            self._trigger_q.put(None)
+            self._trigger_thread.join(timeout=1.0)
+            for code, queued_ns, sent_ns in self.trigger_timestamps:
+                self.logger.log(f"Trigger {code}: queued_ns={queued_ns}, sent_ns={sent_ns}")
+        # Log sample-accurate beep onsets (audio stream time) and stop the audio stream
+        if self._mixer is not None:
+            for action in self._beep_actions:
+                self.logger.log(f"Beep onset: stream_time={action.actual_time:.6f}")
+            self._beep_actions = []
+            self._mixer.close()
+            self._mixer = None
+        # Write out queued log lines
+        self.logger.close()
         # Close serial communication port
         self.serial_comm.close()
         # Future: Close TCP client if implemented
         # if self.tcp_client:
         #     self.tcp_client.close()
     
-    def run_motor_execution_trial(self, trial_condition):
+    def _trigger_worker(self):
+        """
+        Background loop that writes queued triggers to the serial port.
+        Only triggers that were actually written get a send time. A None item stops the worker.
+        """
+        while True:
+            item = self._trigger_q.get()
+            if item is None:
+                break
+            payload, queued_ns = item
+            try:
+                written = self.serial_comm._raw_write(payload)
+            except Exception as e:
+                self.logger.log(f"Error sending trigger {payload[0]}: {e}", echo=True)
+                continue
+            if not written:
+                continue
+            # Stamped as soon as the write returns; console output goes through the logger thread
+            sent_ns = time.perf_counter_ns()
+            self.trigger_timestamps.append((payload[0], queued_ns, sent_ns))
+            self.logger.log(f"Sent trigger: {payload[0]} (0x{payload[0]:02X})", echo=True)
+            time.sleep(0.001)
+
+    def _log_event(self, message):
+        """
+        Print a message and append it to the text log, both on the logger's writer thread.
+        """
+        self.logger.log(message, echo=True)
+
+    def _send_trigger(self, payload):
+        """
+        Hand a precomputed single-byte trigger payload to the serial worker thread
+        and return immediately.
+        """
+        self._trigger_q.put_nowait((payload, time.perf_counter_ns()))
+
+    def _build_trial_plan(self):
+        """
+        Prebuild an (image_surface, trigger_bytes) tuple for every condition code so each
+        trial resolves its stimulus with a single list index (None where the image or
+        trigger is missing). Surfaces are cropped and converted to the display format once
+        here, so trials blit them without a crop rect.
+        Must be called after the stimulus images are loaded.
+        """
+        scaled_images = self.display.scaled_images
+        self._trial_plan = [None] * len(CondCode)
+        for code, name in enumerate(COND_NAMES):
+            surface = scaled_images.get(name)
+            trigger_bytes = self.config.TRIGGER_BYTES_BY_CODE[code]
+            if surface is not None and trigger_bytes is not None:
+                crop_rect = (0, 0, surface.get_width(), surface.get_height())
+                self._trial_plan[code] = (self.display.prepare_stimulus_surface(surface, crop_rect), trigger_bytes)
+        blank_surface = scaled_images["blank"]
+        self._fixation_plan = (self.display.prepare_stimulus_surface(blank_surface), self.config.TRIGGER_FIXATION_ONSET_BYTES)
+
+    def _play_beep(self):
+        """
+        Play the trial-start beep without blocking the display thread.
+        """
+        if self._mixer is not None:
+            # Scheduled on the sample clock; the action reports the true onset once played
+            self._beep_actions.append(self._mixer.play_buffer(
+                self._beep_buffer, channels=1, start=self._mixer.time + self._BEEP_DELAY_S))
+        elif self._beep is not None:
+            self._beep.play()
+        else:
+            cross_platform_beep(self._BEEP_F, self._BEEP_D)
+
+    def run_motor_execution_trial(self, cond_code, schedule_index):
         """
         Execute a single motor execution trial where participant physically moves their finger.
         
@@ -264,60 +549,49 @@ class Experiment:
         rather than just motor imagery. These trials help establish baseline motor patterns.
         
         Args:
-            trial_condition (str): The finger condition to present (e.g., 'thumb', 'index', 'sixth')
+            cond_code (int): CondCode of the finger to present (e.g. CondCode.THUMB, CondCode.SIXTH)
+            schedule_index (int): Index into the precomputed fixation duration schedule
         """
         # Log trial information for debugging and record-keeping
-        print(f"Motor Execution Trial, Condition: {trial_condition} "
-              f"(Category: {self.trial_generator.get_condition_category(trial_condition)})")
-        
-        self.logger.log(f"Motor Execution Trial, Condition: {trial_condition} "
-                        f"(Category: {self.trial_generator.get_condition_category(trial_condition)})")
+        self._log_event(f"Motor Execution Trial, Condition: {COND_NAMES[cond_code]} "
+                        f"(Category: {self._cat_of[cond_code]})")
         
         # Display fixation cross to prepare participant for stimulus
         # Send EEG trigger to mark fixation onset
-        self.serial_comm.send_trigger(self.config.TRIGGER_FIXATION_ONSET)
+        self._send_trigger(self._T_FIX)
         # Display blank image instead of fixation cross with slight timing variation to prevent anticipation
         # Original fixation cross code (commented out):
         # self.display.display_fixation_cross(fixation_duration)
         
-        fixation_duration = random.choice([
-            self.config.FIXATION_IN_TRIAL_DURATION_MS + 500, 
-            self.config.FIXATION_IN_TRIAL_DURATION_MS - 500
-        ])
+        fixation_duration = int(self._fixation_schedule[schedule_index])
         
         # New blank image display:
-        blank_image_surface = self.display.scaled_images["blank"]
-        self.display.display_image_stimulus(
-            blank_image_surface, 
-            fixation_duration, 
-            (0, 0, blank_image_surface.get_width(), blank_image_surface.get_height())
-        )
+        blank_image_surface, _ = self._fixation_plan
+        self.display.display_image_stimulus(blank_image_surface, fixation_duration)
         
         # Play beep sound to indicate trial start
-        cross_platform_beep(self.config.BEEP_FREQUENCY, self.config.BEEP_DURATION_MS)
+        self._play_beep()
         
-        # Get the appropriate trigger code for blue (motor execution) version
-        stimulus_trigger_code = self.config.STIMULUS_TRIGGER_MAP.get(trial_condition + "_blue")
-        if trial_condition == "sixth":
+        # Look up the blue (motor execution) version of the stimulus
+        plan = self._trial_plan[cond_code + BLUE_OFFSET]
+        if cond_code == CondCode.SIXTH:
             print('Finger should flex')
             fc.execute_finger(100)
             
 
         # Display the stimulus if trigger code exists
-        if stimulus_trigger_code is not None:
-            # Get the blue-highlighted version of the stimulus image
-            current_image_surface = self.display.scaled_images[trial_condition + "_blue"]
+        if plan is not None:
+            current_image_surface, stimulus_trigger_bytes = plan
             # Send EEG trigger to mark stimulus onset
-            self.serial_comm.send_trigger(stimulus_trigger_code)
-            # Display the stimulus image with specified duration and cropping
+            self._send_trigger(stimulus_trigger_bytes)
+            # Display the stimulus image (already cropped and converted) for the specified duration
             self.display.display_image_stimulus(
                 current_image_surface, 
-                self.config.IMAGE_DISPLAY_DURATION_MS, 
-                (0, 0, current_image_surface.get_width(), current_image_surface.get_height())
+                self._IMG_MS
             )
 
 
-    def run_trial(self, trial_number_global, trial_condition):
+    def run_trial(self, trial_number_global, cond_code):
         """
         Execute a single motor imagery trial where participant imagines finger movement.
         
@@ -326,82 +600,55 @@ class Experiment:
         
         Args:
             trial_number_global (int): Global trial number across all blocks
-            trial_condition (str): The condition to present ('thumb', 'index', 'sixth', 'blank', etc.)
+            cond_code (int): CondCode of the condition to present (CondCode.THUMB, ..., CondCode.BLANK)
             
         Returns:
             str: The trial condition that was presented
         """
         # Log trial information for debugging and record-keeping
-        print(f"Global Trial: {trial_number_global}, Condition: {trial_condition} "
-              f"(Category: {self.trial_generator.get_condition_category(trial_condition)})")
-        self.logger.log(f"Global Trial: {trial_number_global}, Condition: {trial_condition} "
-                        f"(Category: {self.trial_generator.get_condition_category(trial_condition)})")
+        trial_condition = COND_NAMES[cond_code]
+        self._log_event(f"Global Trial: {trial_number_global}, Condition: {trial_condition} "
+                        f"(Category: {self._cat_of[cond_code]})")
         
         # === FIXATION PHASE ===
         # Display fixation cross to prepare participant for stimulus
-        self.serial_comm.send_trigger(self.config.TRIGGER_FIXATION_ONSET)
+        self._send_trigger(self._T_FIX)
         # Display blank image instead of fixation cross with slight timing variation to prevent anticipation effects
         # Original fixation cross code (commented out):
         # self.display.display_fixation_cross(fixation_duration)
         
-        fixation_duration = random.choice([
-            self.config.FIXATION_IN_TRIAL_DURATION_MS + 500, 
-            self.config.FIXATION_IN_TRIAL_DURATION_MS - 500
-        ])
+        # Motor imagery trials follow the motor execution trials in the schedule
+        fixation_duration = int(self._fixation_schedule[self._num_motor_execution_trials + trial_number_global - 1])
         
         # New blank image display:
-        blank_image_surface = self.display.scaled_images["blank"]
-        self.display.display_image_stimulus(
-            blank_image_surface, 
-            fixation_duration, 
-            (0, 0, blank_image_surface.get_width(), blank_image_surface.get_height())
-        )
+        blank_image_surface, _ = self._fixation_plan
+        self.display.display_image_stimulus(blank_image_surface, fixation_duration)
 
         # Play audio cue to indicate trial start
-        cross_platform_beep(self.config.BEEP_FREQUENCY, self.config.BEEP_DURATION_MS)
+        self._play_beep()
 
         # === STIMULUS PHASE ===
-        # Get the appropriate EEG trigger code for this condition
-        stimulus_trigger_code = self.config.STIMULUS_TRIGGER_MAP.get(trial_condition)
-
-        # Handle different trial types
-        if trial_condition == self.config.BLANK_CONDITION_NAME:
-            # BLANK/REST TRIAL: Display "REST" text instead of finger image
-            self.serial_comm.send_trigger(stimulus_trigger_code)
-            # self.display.display_message_screen(
-            #     "REST", 
-            #     duration_ms=self.config.IMAGE_DISPLAY_DURATION_MS, 
-            #     font=self.display.FONT_LARGE, 
-            #     bg_color=self.config.GRAY
-            # )
-            current_image_surface = self.display.scaled_images[trial_condition]
+        # A single lookup yields the surface, crop rectangle and EEG trigger for this condition
+        # (finger imagery trials as well as blank/rest trials)
+        plan = self._trial_plan[cond_code]
+
+        if plan is not None:
+            current_image_surface, stimulus_trigger_bytes = plan
+            # Send EEG trigger to mark stimulus onset
+            self._send_trigger(stimulus_trigger_bytes)
             self.display.display_image_stimulus(
-                    current_image_surface, 
-                    self.config.IMAGE_DISPLAY_DURATION_MS, 
-                    (0, 0, current_image_surface.get_width(), current_image_surface.get_height())
-                )
+                current_image_surface, 
+                self._IMG_MS
+            )
         elif trial_condition in self.display.scaled_images:
-            # FINGER IMAGERY TRIAL: Display finger image stimulus
-            if stimulus_trigger_code is not None:
-                # Get the stimulus image for this condition
-                current_image_surface = self.display.scaled_images[trial_condition]
-                # Send EEG trigger to mark stimulus onset
-                self.serial_comm.send_trigger(stimulus_trigger_code)
-                # Display the stimulus with cropping to show 75% of height
-                self.display.display_image_stimulus(
-                    current_image_surface, 
-                    self.config.IMAGE_DISPLAY_DURATION_MS, 
-                    (0, 0, current_image_surface.get_width(), current_image_surface.get_height())
-                )
-            else:
-                # Warning: stimulus exists but no trigger defined
-                print(f"Warning: No trigger defined for image condition '{trial_condition}'. Stimulus shown without trigger.")
-                current_image_surface = self.display.scaled_images[trial_condition]
-                self.display.display_image_stimulus(
-                    current_image_surface, 
-                    self.config.IMAGE_DISPLAY_DURATION_MS, 
-                    (0, 0, current_image_surface.get_width(), current_image_surface.get_height())
-                )
+            # Warning: stimulus exists but no trigger defined
+            print(f"Warning: No trigger defined for image condition '{trial_condition}'. Stimulus shown without trigger.")
+            current_image_surface = self.display.scaled_images[trial_condition]
+            self.display.display_image_stimulus(
+                current_image_surface, 
+                self._IMG_MS, 
+                (0, 0, current_image_surface.get_width(), current_image_surface.get_height())
+            )
         else:
             # ERROR: Unknown trial condition
             print(f"Error: Unknown trial condition or image key '{trial_condition}'.")
@@ -412,20 +659,24 @@ class Experiment:
                 bg_color=self.config.RED
             )
 
-        # === PERIODIC QUESTIONNAIRE ===
-        # Every 5th trial, ask participant about motor imagery performance
-        if trial_number_global % 5 == 0:
-            yes = self.display.ask_yes_no_question("Did you perform motor imagery?")
-            # Send appropriate trigger based on response
-            if yes:
-                self.serial_comm.send_trigger(self.config.YES_TRIGGER)
-            else:
-                self.serial_comm.send_trigger(self.config.NO_TRIGGER)
-            # Log the response for analysis
-            self.logger.log(f"Participant response: {'Yes' if yes else 'No'} for trial {trial_number_global}")
-                        
         return trial_condition
 
+    def _run_questionnaire(self, trial_number_global):
+        """
+        Ask the participant whether they performed motor imagery and send/log the answer.
+        Returns the time spent on the question in milliseconds.
+        """
+        start_ticks = pygame.time.get_ticks()
+        yes = self.display.ask_yes_no_question("Did you perform motor imagery?")
+        # Send appropriate trigger based on response
+        if yes:
+            self._send_trigger(self.config.YES_TRIGGER_BYTES)
+        else:
+            self._send_trigger(self.config.NO_TRIGGER_BYTES)
+        # Log the response for analysis
+        self.logger.log(f"Participant response: {'Yes' if yes else 'No'} for trial {trial_number_global}")
+        return pygame.time.get_ticks() - start_ticks
+
     def run_experiment(self):
         """
         Main experiment execution method that orchestrates the entire experimental session.
@@ -440,6 +691,14 @@ class Experiment:
         # Initialize hardware connections and load stimulus images
         self.serial_comm.initialize()
         self.display.load_stimulus_images()
+        self._build_trial_plan()
+
+        # Generate every block's randomized trial sequence now, instead of stalling
+        # behind a loading screen at the start of each block, stored as int8 condition codes
+        self._all_block_trials = [
+            np.array([COND_CODE_OF[condition] for condition in block_conditions], dtype=np.int8)
+            for block_conditions in self.trial_generator.generate_trial_lists(self.config.NUM_BLOCKS)
+        ]
         
         # === INTRODUCTION SCREEN ===
         # Display welcome message and wait for participant to begin
@@ -463,12 +722,12 @@ class Experiment:
         self.display.display_message_screen(instruction, wait_for_key=True, font=self.display.FONT_LARGE)
         
         # Create randomized list of motor execution trials (all finger types including sixth)
-        motor_execution_trails = self.config.NORMAL_FINGER_TYPES + ["sixth"]
-        random.shuffle(motor_execution_trails)
+        motor_execution_conditions = np.array([COND_CODE_OF[name] for name in self.config.NORMAL_FINGER_TYPES + ["sixth"]], dtype=np.int8)
+        motor_execution_trails = motor_execution_conditions[self._rng.permutation(len(motor_execution_conditions))].tolist()
         
         # Execute each motor execution trial
-        for trial_index, condition in enumerate(motor_execution_trails, 1):
-            presented_condition = self.run_motor_execution_trial(condition)
+        for trial_index, condition in enumerate(motor_execution_trails):
+            presented_condition = self.run_motor_execution_trial(condition, trial_index)
             # Short break between motor execution trials
             self.display.display_blank_screen(self.config.SHORT_BREAK_DURATION_MS)
 
@@ -480,20 +739,16 @@ class Experiment:
         instruction = "#red:MOTOR IMAGERY#\n\nIn the next slides, you will see a hand illustration\nwith one of the fingers highlighted less gray.\n\nImagine, kinesthetically, flexing and extending the higlighted finger.\nPlease try to avoid any movement throughout the exercise.\n\nPress any key to continue."
         self.display.display_message_screen(instruction, wait_for_key=True, font=self.display.FONT_LARGE)
         
+        quit_event_types = [pygame.QUIT, pygame.KEYDOWN]
+
         # === MAIN EXPERIMENTAL BLOCKS ===
         # Execute the specified number of experimental blocks
         for block_num in range(1, self.config.NUM_BLOCKS + 1):
             # Mark block start in EEG data
-            self.serial_comm.send_trigger(self.config.TRIGGER_BLOCK_START)
+            self._send_trigger(self.config.TRIGGER_BLOCK_START_BYTES)
             
-            # Generate randomized trial sequence for this block
-            self.display.display_loading_screen(
-                "Generating trials for Block...", 
-                font=self.display.FONT_MEDIUM, 
-                bg_color=self.config.BLACK, 
-                text_color=self.config.WHITE
-            )
-            current_block_trial_conditions = self.trial_generator.generate_trial_list_for_block()
+            # Randomized trial sequence for this block (generated at startup)
+            current_block_trial_conditions = self._all_block_trials[block_num - 1]
 
             # === TRIAL VALIDATION ===
             # Verify that the generated trial list has the correct number of trials
@@ -510,14 +765,16 @@ class Experiment:
             # === EXECUTE TRIALS IN CURRENT BLOCK ===
             # Run each trial in the current block
             for trial_num_in_block, condition in enumerate(current_block_trial_conditions, 1):
-                # Check for quit events (window close or escape key)
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT: 
-                        self._close_all_connections()
-                        self.display.quit_pygame_and_exit()
-                    if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: 
-                        self._close_all_connections()
-                        self.display.quit_pygame_and_exit()
+                # Check for quit events (window close or escape key); peek is a single
+                # boolean query, so events are only fetched when something is pending
+                if pygame.event.peek(quit_event_types):
+                    for event in pygame.event.get(quit_event_types):
+                        if event.type == pygame.QUIT: 
+                            self._close_all_connections()
+                            self.display.quit_pygame_and_exit()
+                        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: 
+                            self._close_all_connections()
+                            self.display.quit_pygame_and_exit()
 
                 # Calculate global trial number across all blocks
                 trial_global_num = (block_num - 1) * self.config.TRIALS_PER_BLOCK + trial_num_in_block
@@ -528,8 +785,13 @@ class Experiment:
                 # === DATA LOGGING ===
                 # CSV data logging removed - only text logging is used
 
-                # Inter-trial interval (short break between trials)
-                self.display.display_blank_screen(self.config.SHORT_BREAK_DURATION_MS)
+                # Inter-trial interval (short break between trials). Every 5th trial the
+                # motor imagery questionnaire runs first and its duration counts toward the break.
+                break_ms = self._SHORT_BREAK_MS
+                if trial_global_num % 5 == 0:
+                    break_ms -= self._run_questionnaire(trial_global_num)
+                if break_ms > 0:
+                    self.display.display_blank_screen(break_ms)
                 
             # === INTER-BLOCK BREAK ===
             # Handle break between blocks or end-of-experiment messaging
@@ -550,7 +812,7 @@ class Experiment:
                     server_response=block_end_server_response
                 )
             # Mark block end in EEG data
-            self.serial_comm.send_trigger(self.config.TRIGGER_BLOCK_END)
+            self._send_trigger(self.config.TRIGGER_BLOCK_END_BYTES)
 
             
         # === EXPERIMENT COMPLETION ===
@@ -15,6 +15,7 @@ Features:
 Usage:
     python assessment_classifier.py --participant randy
     python assessment_classifier.py -p john --data_dir ./custom/path/
+    python assessment_classifier.py --participants randy,john,mary
 """
 
 import numpy as np
@@ -24,7 +25,17 @@ import os
 import argparse
 import time
 import csv
-from ERDCalculator.ERDCalculator import ERDCalculator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Stimulus codes analyzed: fingers 1-5 (thumb to pinky), sixth finger 6, rest condition 7
+_STIM_CODES = np.arange(1, 8, dtype=np.int8)
+# Summary categories (NT=Normal Touch, ST=Sixth finger Touch, Rest), in report order
+_STIM_CATEGORIES = {
+    'NT': np.array([1, 2, 3, 4, 5], dtype=np.int8),
+    'ST': np.array([6], dtype=np.int8),
+    'Rest': np.array([7], dtype=np.int8),
+}
+_CONDITION_NAMES = {1: 'thumb', 2: 'index', 3: 'middle', 4: 'ring', 5: 'pinky', 6: 'sixth', 7: 'blank'}
 
 
 class AssessmentConfig:
@@ -32,15 +43,28 @@ class AssessmentConfig:
     Configuration class for EEG analysis parameters and file paths.
     Modify these settings to match your experimental setup.
     """
-    def __init__(self, participant=None, data_dir=None):
+    def __init__(self, participant=None, data_dir=None, cache_dir=None):
         # === DATA PATH CONFIGURATION ===
         self.DATA_DIR = data_dir if data_dir else './data/rawdata/'  # Base directory for raw data files
+        self.CACHE_DIR = cache_dir if cache_dir else './data/cache/'  # Cache files, kept out of the raw data tree
         
         # Participant identifier is required - must be provided at runtime
         if participant is None:
             raise ValueError("Participant identifier is required. Use --participant argument.")
         self.PARTICIPANT = participant
         
+        # === CACHING ===
+        # Keep a float32 FIF copy of the raw recording in CACHE_DIR so reruns skip BrainVision
+        # parsing; it is rebuilt when the source files change. Off by default: writing it reads
+        # the whole recording, and the epoch cache already covers reruns
+        self.USE_FIF_CACHE = False
+        # Keep the extracted epochs of each recording in an .npz file in CACHE_DIR, so reruns
+        # with the same epoching settings skip reading the recording altogether
+        self.USE_EPOCH_CACHE = True
+        # Load the whole recording into memory. When False, only the epoch windows around
+        # the markers are read from disk (through mne.Epochs)
+        self.PRELOAD_RAW = False
+        
         # === EEG DATA PARAMETERS ===
         self.FOCUS_CHANNEL_NAMES = ["C1", "C3", "CP1", "CP3"]  # Motor cortex channels
         self.BAD_CHANNELS = ['FT9', 'TP9', 'FT10', 'TP10']  # Channels to exclude from analysis
@@ -60,6 +84,15 @@ class AssessmentConfig:
         # === MOVING AVERAGE SPECIFIC PARAMETERS ===
         self.MOVING_AVERAGE_WINDOW_SIZE = 100  # Window size in samples
         self.MOVING_AVERAGE_METHOD = 'db'  # 'percentage' or 'db'
+        # Spread the Numba kernels (moving average, band power, fused bandpass) over threads;
+        # only worth it for many epochs
+        self.NUMBA_PARALLEL = False
+        # Compute the ERD methods of run_analysis concurrently on threads sharing the epochs
+        # (ignored when NUMBA_PARALLEL is set)
+        self.PARALLEL_METHODS = True
+        # Threads for the blocked filter/Welch passes within one method; only used for
+        # recordings with many epochs (see ERDCalculator._for_each_block)
+        self.N_THREADS = 1
         
         # === STIMULUS MAPPING === 
         self.EVENTS_MAP = {
@@ -95,11 +128,19 @@ class AssessmentClassifier:
         self.raw_data = None
         self.events = None
         self.event_id = None
-        self.data_df = None
-        self.markers_df = None
+        self.eeg_array = None
+        self.picks = None
+        self.marker_events = None
+        self.onsets = None
+        self.stimuli = None
+        self.epochs = None
+        self.epoch_stimuli = None
+        self.filtered_epochs = None
         self.erd_calculator = None
         self.focus_channels_indices = None
         self.trial_logger = None
+        self.trial_log_filepath = None
+        self.trial_log_enabled = False  # Set once the trial log file has been created
         
     def load_data(self):
         """
@@ -116,14 +157,23 @@ class AssessmentClassifier:
         if not os.path.exists(vhdr_file):
             raise FileNotFoundError(f"BrainVision header file not found: {vhdr_file}")
         
+        # Reuse the epochs of a previous run when the recording and epoching settings match
+        if self.config.USE_EPOCH_CACHE:
+            epoch_cache_file = os.path.join(self.config.CACHE_DIR, f"{self.config.PARTICIPANT}_cache_epochs.npz")
+            epoch_cache_key = self._epoch_cache_key(vhdr_file)
+            if self._load_epoch_cache(epoch_cache_file, epoch_cache_key):
+                return
+        
         print(f"Loading BrainVision file: {vhdr_file}")
         
-        # Load raw data
-        self.raw_data = mne.io.read_raw_brainvision(vhdr_file, preload=True, verbose=False)
+        # Load raw data (from the FIF cache when it matches the BrainVision files)
+        self.raw_data = self._read_raw(vhdr_file)
         
         # Convert data from Volts to microvolts to match real-time data scaling
-        # MNE loads BrainVision data in V, but livestream data is typically in µV
-        self.raw_data.apply_function(lambda x: x * 1e6)
+        # MNE loads BrainVision data in V, but livestream data is typically in µV.
+        # Lazily read recordings are converted when the epochs are extracted.
+        if self.config.PRELOAD_RAW:
+            self.raw_data.apply_function(lambda x: x * 1e6)
         
         # Extract events from annotations
         self.events, self.event_id = mne.events_from_annotations(self.raw_data, verbose=False)
@@ -142,54 +192,203 @@ class AssessmentClassifier:
         # Prepare data for analysis
         self._prepare_data_for_analysis()
         
+        if self.config.USE_EPOCH_CACHE:
+            self._save_epoch_cache(epoch_cache_file, epoch_cache_key)
+        
+    @staticmethod
+    def _source_key(vhdr_file):
+        """
+        Names, sizes and modification times of the BrainVision files of a recording.
+        """
+        stem = os.path.splitext(vhdr_file)[0]
+        return ";".join(
+            f"{os.path.basename(path)}:{os.path.getsize(path)}:{os.path.getmtime(path)}"
+            for path in (stem + ext for ext in ('.vhdr', '.vmrk', '.eeg'))
+            if os.path.exists(path)
+        )
+    
+    def _epoch_cache_key(self, vhdr_file):
+        """
+        Key of the epoch cache: the BrainVision files plus every setting that changes the epochs.
+        """
+        return ";".join((
+            self._source_key(vhdr_file),
+            f"pre={self.config.EPOCH_PRE_STIMULUS_SECONDS}",
+            f"post={self.config.EPOCH_POST_STIMULUS_SECONDS}",
+            f"bad={','.join(sorted(self.config.BAD_CHANNELS))}",
+        ))
+    
+    def _load_epoch_cache(self, cache_file, cache_key):
+        """
+        Restore the epochs, markers and channel layout from the epoch cache.
+        
+        Returns:
+            bool: True if the cache matched and was loaded, False otherwise
+        """
+        if not os.path.exists(cache_file):
+            return False
+        try:
+            with np.load(cache_file) as cache:
+                if str(cache['key']) != cache_key:
+                    return False
+                epochs = cache['epochs']
+                epoch_stimuli = cache['stimuli']
+                marker_events = cache['marker_events']
+                clean_channel_names = [str(ch) for ch in cache['channels']]
+                sfreq = float(cache['sfreq'])
+        except Exception as e:
+            print(f"Warning: Could not read epoch cache ({e})")
+            return False
+        
+        print(f"Loading cached epochs: {cache_file}")
+        print(f"Sampling Frequency: {sfreq} Hz")
+        print(f"Number of Channels: {len(clean_channel_names)} (bad channels removed)")
+        
+        self.raw_data = None
+        self.events = None
+        self.event_id = None
+        self.eeg_array = None
+        self.picks = None
+        self.marker_events = marker_events
+        self.onsets = marker_events[:, 0].astype(np.int64)
+        self.stimuli = marker_events[:, 2].astype(np.int8)
+        self.epochs = epochs
+        self.epoch_stimuli = epoch_stimuli
+        self.filtered_epochs = None
+        
+        print(f"Number of markers: {len(self.onsets)} ({len(epochs)} epochs)")
+        self._find_focus_channels(clean_channel_names)
+        self._initialize_erd_calculator(clean_channel_names, sfreq)
+        return True
+    
+    def _save_epoch_cache(self, cache_file, cache_key):
+        """
+        Write the epochs of the prepared recording to the epoch cache.
+        """
+        epochs, epoch_stimuli = self._gather_epochs()
+        try:
+            # Uncompressed: EEG samples barely compress and loading stays a plain read
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            np.savez(cache_file, key=np.array(cache_key), epochs=epochs, stimuli=epoch_stimuli,
+                     marker_events=self.marker_events, channels=np.array(self.erd_calculator.channel_names),
+                     sfreq=np.array(self.erd_calculator.sampling_freq))
+            print(f"Cached epochs to: {cache_file}")
+        except Exception as e:
+            print(f"Warning: Could not write epoch cache ({e})")
+        
+    def _read_raw(self, vhdr_file):
+        """
+        Read the BrainVision recording, going through a FIF cache when enabled.
+
+        The cache key is built from the names, sizes and modification times of the
+        BrainVision files, so editing or replacing them invalidates the cache.
+        """
+        preload = self.config.PRELOAD_RAW
+        if not self.config.USE_FIF_CACHE:
+            return mne.io.read_raw_brainvision(vhdr_file, preload=preload, verbose=False)
+        
+        cache_key = self._source_key(vhdr_file)
+        cache_file = os.path.join(self.config.CACHE_DIR, f"{self.config.PARTICIPANT}_cache_raw.fif")
+        key_file = cache_file + ".key"
+        
+        if os.path.exists(cache_file) and os.path.exists(key_file):
+            with open(key_file) as f:
+                if f.read() == cache_key:
+                    print(f"Loading cached FIF file: {cache_file}")
+                    return mne.io.read_raw_fif(cache_file, preload=preload, verbose=False)
+        
+        raw = mne.io.read_raw_brainvision(vhdr_file, preload=preload, verbose=False)
+        try:
+            os.makedirs(self.config.CACHE_DIR, exist_ok=True)
+            raw.save(cache_file, fmt='single', overwrite=True, verbose=False)
+            with open(key_file, 'w') as f:
+                f.write(cache_key)
+            print(f"Cached raw data to: {cache_file}")
+        except Exception as e:
+            print(f"Warning: Could not write FIF cache ({e})")
+        return raw
+        
     def _prepare_data_for_analysis(self):
         """
         Prepare loaded data for ERD analysis:
         1. Remove bad channels
         2. Create focus channel indices
-        3. Convert to DataFrame format
+        3. Extract the clean channels as a NumPy array (when the recording is preloaded)
         4. Prepare markers DataFrame
         """
         print("\n=== Preparing Data for Analysis ===")
         
         # Get clean channel names (excluding bad channels)
-        clean_channel_names = [ch for ch in self.raw_data.ch_names if ch not in self.config.BAD_CHANNELS]
+        bad_channels = set(self.config.BAD_CHANNELS)
+        clean_channel_names = [ch for ch in self.raw_data.ch_names if ch not in bad_channels]
         
         # Find indices of focus channels
-        self.focus_channels_indices = []
-        for ch in self.config.FOCUS_CHANNEL_NAMES:
-            if ch in clean_channel_names:
-                self.focus_channels_indices.append(clean_channel_names.index(ch))
-            else:
-                print(f"Warning: Focus channel '{ch}' not found in clean channel list")
+        self._find_focus_channels(clean_channel_names)
         
-        print(f"Focus channels: {self.config.FOCUS_CHANNEL_NAMES}")
-        print(f"Focus channel indices: {self.focus_channels_indices}")
+        # Take the clean channels straight from MNE's buffer as a (n_channels, n_samples) array.
+        # Only ratios of band power are computed, so the scaling to_data_frame applied is not needed.
+        self.picks = mne.pick_channels(self.raw_data.ch_names, include=[], exclude=self.config.BAD_CHANNELS, ordered=False)
+        if self.config.PRELOAD_RAW:
+            self.eeg_array = self.raw_data.get_data(picks=self.picks).astype(np.float32, copy=False)
+        else:
+            self.eeg_array = None  # Epoch windows are read from disk in _gather_epochs
         
-        # Convert raw data to DataFrame and remove bad channels + time column
-        columns_to_drop = ['time'] + self.config.BAD_CHANNELS
-        self.data_df = self.raw_data.to_data_frame().drop(columns=columns_to_drop, errors='ignore')
+        # Filter the MNE events array for relevant stimulus codes (1-7)
+        codes = self.events[:, 2]
+        self.marker_events = self.events[(codes >= _STIM_CODES[0]) & (codes <= _STIM_CODES[-1])]
         
-        # Prepare events DataFrame - filter for relevant stimulus codes (1-7)
-        events_df = pd.DataFrame(self.events, columns=['onset', 'duration', 'description'])
-        self.markers_df = events_df[events_df['description'].isin(list(range(1, 8)))].copy()
+        # Marker onsets (samples) and stimulus codes as plain arrays for the epoch loop
+        self.onsets = self.marker_events[:, 0].astype(np.int64)
+        self.stimuli = self.marker_events[:, 2].astype(np.int8)
         
-        print(f"Data shape: {self.data_df.shape}")
-        print(f"Number of markers: {len(self.markers_df)}")
+        print(f"Data shape: ({len(self.picks)}, {self.raw_data.n_times})")
+        print(f"Number of markers: {len(self.onsets)}")
         print(f"Marker distribution:")
-        print(self.markers_df['description'].value_counts().sort_index())
+        print(pd.Series(self.stimuli, name='description').value_counts().sort_index())
+        
+        # Epochs are gathered lazily for the new recording
+        self.epochs = None
+        self.epoch_stimuli = None
+        self.filtered_epochs = None
         
         # Initialize ERD Calculator
-        self._initialize_erd_calculator(clean_channel_names)
+        self._initialize_erd_calculator(clean_channel_names, self.raw_data.info['sfreq'])
+        
+    def _find_focus_channels(self, clean_channel_names):
+        """
+        Set the indices of the configured focus channels within the clean channel list.
+        """
+        channel_index = {ch: i for i, ch in enumerate(clean_channel_names)}
+        self.focus_channels_indices = []
+        for ch in self.config.FOCUS_CHANNEL_NAMES:
+            if ch in channel_index:
+                self.focus_channels_indices.append(channel_index[ch])
+            else:
+                print(f"Warning: Focus channel '{ch}' not found in clean channel list")
         
-    def _initialize_erd_calculator(self, channel_names):
+        print(f"Focus channels: {self.config.FOCUS_CHANNEL_NAMES}")
+        print(f"Focus channel indices: {self.focus_channels_indices}")
+        
+    @property
+    def markers_df(self):
+        """
+        Selected markers as a DataFrame (onset, duration, description), built on demand.
+        """
+        if self.marker_events is None:
+            return None
+        return pd.DataFrame(self.marker_events, columns=['onset', 'duration', 'description'])
+    
+    def _initialize_erd_calculator(self, channel_names, sfreq):
         """
         Initialize the ERD Calculator with current configuration.
         
         Args:
             channel_names (list): List of clean channel names for analysis
+            sfreq (float): Sampling frequency of the recording in Hz
         """
-        sfreq = self.raw_data.info['sfreq']
+        # Imported here: SciPy's signal module and the Numba kernels take over a second to
+        # load, which --help and argument errors should not pay for
+        from ERDCalculator.ERDCalculator import ERDCalculator
         
         self.erd_calculator = ERDCalculator(
             sampling_freq=sfreq,
@@ -198,11 +397,62 @@ class AssessmentClassifier:
             bandpass_low=self.config.BANDPASS_LOW,
             bandpass_high=self.config.BANDPASS_HIGH,
             channel_names=channel_names,
-            focus_channels_indices=self.focus_channels_indices
+            focus_channels_indices=self.focus_channels_indices,
+            n_threads=self.config.N_THREADS
         )
         
         print(f"ERD Calculator initialized with {len(channel_names)} channels")
         
+    def _gather_epochs(self):
+        """
+        Extract all in-bounds epochs in a single gather, once per prepared recording.
+        
+        Returns:
+            tuple: (epochs (n_epochs, n_channels, n_samples), stimulus codes (n_epochs,))
+        """
+        if self.epochs is None:
+            pre = self.erd_calculator.samples_before_marker
+            post = self.erd_calculator.samples_after_marker
+            valid = (self.onsets >= pre) & (self.onsets + post < self.raw_data.n_times)
+            for marker_onset in self.onsets[~valid]:
+                print(f"Skipping epoch at sample {marker_onset}: out of bounds")
+            
+            if self.eeg_array is not None:
+                sample_idx = self.onsets[valid][:, None] + np.arange(-pre, post)[None, :]
+                # (n_channels, n_epochs, n_samples) -> contiguous (n_epochs, n_channels, n_samples),
+                # so each channel's samples are stride-1 for the filter and reductions
+                self.epochs = np.ascontiguousarray(self.eeg_array[:, sample_idx].transpose(1, 0, 2))
+                self.epoch_stimuli = self.stimuli[valid]
+            else:
+                # Only the epoch windows are read from disk. mne.Epochs needs distinct event
+                # samples, so each window is read once and markers sharing a sample get a copy
+                # of it, keeping one epoch per marker like the in-memory path above
+                unique_onsets, window_of_marker = np.unique(self.onsets[valid], return_inverse=True)
+                events = np.column_stack((unique_onsets, np.zeros(len(unique_onsets), dtype=np.int64),
+                                          np.ones(len(unique_onsets), dtype=np.int64)))
+                sfreq = self.raw_data.info['sfreq']
+                mne_epochs = mne.Epochs(self.raw_data, events, tmin=-pre / sfreq, tmax=(post - 1) / sfreq,
+                                        picks=self.picks, baseline=None, preload=True,
+                                        reject_by_annotation=False, verbose=False)
+                # Scale the preloaded buffer (in V) straight into a float32 µV array, without
+                # the intermediate float64 copy get_data would make
+                data = mne_epochs.get_data(copy=False)
+                self.epochs = np.empty(data.shape, dtype=np.float32)
+                np.multiply(data, 1e6, out=self.epochs, casting='same_kind')
+                if len(unique_onsets) < len(window_of_marker):
+                    self.epochs = self.epochs[window_of_marker]
+                self.epoch_stimuli = self.stimuli[valid]
+        return self.epochs, self.epoch_stimuli
+    
+    def _get_filtered_epochs(self):
+        """
+        Bandpass-filtered, CAR-referenced epochs, computed once and shared by all ERD methods.
+        """
+        if self.filtered_epochs is None:
+            epochs, _ = self._gather_epochs()
+            self.filtered_epochs = self.erd_calculator.preprocess_epochs(epochs)
+        return self.filtered_epochs
+    
     def calculate_erd_for_all_markers(self, method='bandpass', per_channel=False,
                                     moving_average_window_size=100, moving_average_method='db'):
         """
@@ -217,70 +467,70 @@ class AssessmentClassifier:
             moving_average_method (str): Method for moving average ('percentage' or 'db')
             
         Returns:
-            list: List of dictionaries containing ERD results
+            pd.DataFrame: One row per valid epoch with 'stimulus' and 'erd_value' columns
+                          (plus 'erds' for the moving average method)
+        """
+        results_df, _ = self._calculate_erd(method, per_channel, moving_average_window_size, moving_average_method)
+        return results_df
+    
+    def _calculate_erd(self, method, per_channel=False, moving_average_window_size=100, moving_average_method='db'):
+        """
+        calculate_erd_for_all_markers, also returning the float64 ERD value of every row
+        (the DataFrame column is float32).
         """
         print(f"\n--- Calculating ERD using method: '{method}' ---")
         
-        results = []
-        processed_epochs = 0
-        
-        for idx, marker_row in self.markers_df.iterrows():
-            marker_onset = int(marker_row['onset'])
-            stimulus_description = int(marker_row['description'])
-            
-            # Extract epoch data around the marker
-            epoch_start = marker_onset - self.erd_calculator.samples_before_marker
-            epoch_end = marker_onset + self.erd_calculator.samples_after_marker
-            
-            # Check bounds
-            if epoch_start < 0 or epoch_end >= len(self.data_df):
-                print(f"Skipping epoch at sample {marker_onset}: out of bounds")
-                continue
-                
-            # Extract epoch data and transpose to (channels, samples)
-            epoch_data = self.data_df.iloc[epoch_start:epoch_end].values.T
-            
-            # Calculate ERD using the specified method
-            erd_value = None
-            erds = None  # For moving average method
-            
-            if method == 'bandpass':
-                erd_value = self.erd_calculator.calculate_erd_from_bandpass(epoch_data, return_mean=True)
-            elif method == 'welch':
-                erd_value = self.erd_calculator.calculate_erd_from_welch(epoch_data, return_mean=True)
-            elif method == 'db_correction':
-                erd_value = self.erd_calculator.calculate_erd_from_db_correction(epoch_data, return_mean=True)
-            elif method == 'moving_average':
-                result = self.erd_calculator.calculate_erd_moving_average(
-                    epoch_data, 
-                    window_size_samples=moving_average_window_size,
-                    return_mean=True, 
-                    method=moving_average_method
-                )
-                if isinstance(result, tuple):
-                    erd_value, erds = result
-                else:
-                    erd_value = result
+        epochs, epoch_stimuli = self._gather_epochs()
+        
+        # Every method runs as one batched call over all epochs.
+        # Filtered epochs are reused if run_analysis already computed them; otherwise the
+        # bandpass method filters on its own (fused kernel when Numba is available).
+        batch_erd_values = None
+        if method == 'bandpass':
+            batch_erd_values = self.erd_calculator.calculate_erd_from_bandpass_batch(
+                epochs, processed=self.filtered_epochs, parallel=self.config.NUMBA_PARALLEL)
+        elif method == 'welch':
+            batch_erd_values = self.erd_calculator.calculate_erd_from_welch_batch(epochs)
+            if batch_erd_values is None:
+                batch_erd_values = np.full(len(epochs), np.nan)
+        elif method == 'db_correction':
+            batch_erd_values = self.erd_calculator.calculate_erd_from_db_correction_batch(
+                epochs, processed=self._get_filtered_epochs(), parallel=self.config.NUMBA_PARALLEL)
+        elif method == 'moving_average':
+            result = self.erd_calculator.calculate_erd_moving_average_batch(
+                epochs,
+                window_size_samples=moving_average_window_size,
+                method=moving_average_method,
+                processed=self._get_filtered_epochs(),
+                parallel=self.config.NUMBA_PARALLEL
+            )
+            if result is None:
+                batch_erd_values = np.full(len(epochs), np.nan)
+                erd_curves = None
             else:
-                raise ValueError(f"Unknown method '{method}'. Supported methods are: {self.config.ERD_METHODS}")
-            
-            # Store results
-            if erd_value is not None and not np.isnan(erd_value):
-                result_dict = {
-                    'stimulus': stimulus_description,
-                    'erd_value': erd_value
-                }
-                if erds is not None:
-                    result_dict['erds'] = erds
-                results.append(result_dict)
-                processed_epochs += 1
-                
-                # Log individual trial ERD if trial logger is initialized
-                if hasattr(self, 'trial_log_filepath') and self.trial_log_filepath:
-                    self._log_trial_erd(processed_epochs, stimulus_description, erd_value)
+                batch_erd_values, erd_curves = result
+        else:
+            raise ValueError(f"Unknown method '{method}'. Supported methods are: {self.config.ERD_METHODS}")
+        
+        # One ERD per epoch; epochs without a valid ERD are NaN
+        stim_out = epoch_stimuli.astype(np.int8)
+        erd_values = np.asarray(batch_erd_values, dtype=np.float64)
+        
+        # Drop epochs without a valid ERD in one vectorized pass
+        mask = ~np.isnan(erd_values)
+        processed_epochs = int(mask.sum())
+        
+        # Log individual trial ERDs if trial logger is initialized
+        if self.trial_log_enabled:
+            self._log_trial_erds(stim_out[mask].tolist(), erd_values[mask].tolist())
         
         print(f"Finished ERD calculation. Successfully processed {processed_epochs} epochs.")
-        return results
+        
+        # The arrays back the DataFrame columns directly; float32 halves the summary passes' reads
+        results_df = pd.DataFrame({'stimulus': stim_out[mask], 'erd_value': erd_values[mask].astype(np.float32)})
+        if method == 'moving_average' and erd_curves is not None:
+            results_df['erds'] = list(erd_curves[mask])
+        return results_df, erd_values[mask]
     
     def calculate_rest_boundary(self, erd_results, target_value='erd_value', outlier_range=(-100, 100)):
         """
@@ -294,18 +544,20 @@ class AssessmentClassifier:
         Returns:
             float: Mean ERD value from REST trials to use as boundary threshold
         """
-        # Filter for REST trials (stimulus value 7) and remove outliers
-        rest_trials = erd_results[
-            (erd_results['stimulus'] == 7) &  # REST condition
-            (erd_results[target_value].between(outlier_range[0], outlier_range[1]))
-        ]
+        # Filter for REST trials (stimulus value 7) and remove outliers with plain array masks
+        values = erd_results[target_value].to_numpy()
+        rest_mask = (
+            (erd_results['stimulus'].to_numpy() == 7) &  # REST condition
+            (values >= outlier_range[0]) & (values <= outlier_range[1])
+        )
+        rest_count = int(rest_mask.sum())
         
-        if len(rest_trials) == 0:
+        if rest_count == 0:
             print("Warning: No valid REST trials found for boundary calculation. Using boundary=0")
             return 0.0
         
-        boundary = rest_trials[target_value].mean()
-        print(f"Dynamic REST boundary calculated: {boundary:.3f} (from {len(rest_trials)} REST trials)")
+        boundary = float(values[rest_mask].mean())
+        print(f"Dynamic REST boundary calculated: {boundary:.3f} (from {rest_count} REST trials)")
         return boundary
 
     def get_summary(self, erd_results, boundary, target_value='erd_value'):
@@ -319,66 +571,70 @@ class AssessmentClassifier:
             target_value (str): Column name to summarize
             
         Returns:
-            pd.DataFrame: Summary table with original and filtered mean, std dev, and count for each category
+            pd.DataFrame: Summary table with original and filtered mean, std dev, and count for each category,
+                          plus the integer filtered count in 'Count_Value'
         """
-        # Define stimulus categories (NT=Normal Touch, ST=Sixth finger Touch, Rest)
-        STIMULUS_CATEGORIES = {
-            'NT': {'stimulus_values': list(range(1, 6))},  # Fingers 1-5 (thumb to pinky)
-            'ST': {'stimulus_values': [6]},                # Sixth finger
-            'Rest': {'stimulus_values': [7]},              # Rest condition
-        }
-        
-        summary_data = []
+        return self.get_summaries(erd_results, [boundary], target_value)[0]
+    
+    def get_summaries(self, erd_results, boundaries, target_value='erd_value'):
+        """
+        Generate get_summary tables for several boundaries, sharing the category mapping and
+        the original (all trials) statistics between them.
         
-        # Loop through each category and compute statistics
-        for category_name, conditions in STIMULUS_CATEGORIES.items():
-            stim_values = conditions['stimulus_values']
-            
-            # Get all trials for this category (original/unfiltered)
-            original_df = erd_results[erd_results['stimulus'].isin(stim_values)]
-            
-            # Apply filtering based on boundary and category
-            if category_name in ['NT', 'ST']:
-                # For motor imagery, we expect negative ERD (desynchronization)
-                # Compare against the boundary (could be 0 or REST average)
-                filtered_df = erd_results[
-                    (erd_results[target_value] < boundary) &
-                    (erd_results['stimulus'].isin(stim_values))
-                ]
-            else:  # 'Rest' category
-                # For REST trials, always compare against 0 (not the dynamic boundary)
-                # We expect positive ERD (synchronization) compared to baseline
-                filtered_df = erd_results[
-                    (erd_results[target_value] > 0) &
-                    (erd_results['stimulus'].isin(stim_values))
-                ]
-            
-            # Calculate original statistics (all trials)
-            orig_mean = original_df[target_value].mean()
-            orig_std = original_df[target_value].std()
-            
-            # Calculate filtered statistics
-            filt_mean = filtered_df[target_value].mean()
-            filt_std = filtered_df[target_value].std()
-            filt_count = filtered_df[target_value].count()
+        Args:
+            erd_results (pd.DataFrame): DataFrame containing ERD values and stimulus labels
+            boundaries (list): Thresholds to filter ERD values by sign, e.g. [0, rest_boundary]
+            target_value (str): Column name to summarize
             
-            # Total number of trials for the category
-            total_trials = len(original_df)
+        Returns:
+            list: One summary DataFrame per boundary, in the same order
+        """
+        # Map stimuli to categories (NT=Normal Touch, ST=Sixth finger Touch, Rest) in one pass
+        CATEGORY_ORDER = list(_STIM_CATEGORIES)
+        stimuli = erd_results['stimulus'].to_numpy()
+        values = erd_results[target_value].to_numpy()
+        categories = np.select([np.isin(stimuli, codes) for codes in _STIM_CATEGORIES.values()], CATEGORY_ORDER, default='')
+        is_rest = categories == 'Rest'
+        
+        by_category = pd.DataFrame({'category': categories, 'value': values})
+        # Original statistics (all trials) do not depend on the boundary
+        original_stats = by_category.groupby('category')['value'].agg(['mean', 'std', 'size']).reindex(CATEGORY_ORDER)
+        total_counts = original_stats['size'].fillna(0).astype(int)
+        
+        summaries = []
+        for boundary in boundaries:
+            # Sign filter for all trials:
+            # - NT/ST: motor imagery should show negative ERD (desynchronization) relative to the
+            #   boundary (could be 0 or REST average)
+            # - Rest: always compared against 0 (not the dynamic boundary), expecting positive ERD
+            #   (synchronization) compared to baseline
+            sign_ok = np.where(is_rest, values > 0, values < boundary)
+            filtered_stats = by_category[sign_ok].groupby('category')['value'].agg(['mean', 'std', 'count']).reindex(CATEGORY_ORDER)
+            filtered_counts = filtered_stats['count'].fillna(0).astype(int)
             
-            # Append statistics to summary
-            summary_data.append({
-                'Category': category_name,
-                'Mean': f'{filt_mean:.3f}',  # Use filtered mean as main mean
-                'Std Dev': f'{filt_std:.3f}',  # Use filtered std as main std
-                'Count': f'{filt_count}/{total_trials} ({(filt_count/total_trials*100):.2f}%)',  # Main count column for backward compatibility
-                'Original_Mean': f'{orig_mean:.3f}',
-                'Original_Std': f'{orig_std:.3f}',
-                'Filtered_Mean': f'{filt_mean:.3f}',
-                'Filtered_Std': f'{filt_std:.3f}',
-                'Filtered_Count': f'{filt_count}/{total_trials} ({(filt_count/total_trials*100):.2f}%)'
-            })
-        
-        return pd.DataFrame(summary_data)
+            summary_data = []
+            for category_name in CATEGORY_ORDER:
+                orig_mean, orig_std = original_stats.at[category_name, 'mean'], original_stats.at[category_name, 'std']
+                filt_mean, filt_std = filtered_stats.at[category_name, 'mean'], filtered_stats.at[category_name, 'std']
+                filt_count = filtered_counts[category_name]
+                total_trials = total_counts[category_name]
+                
+                # Append statistics to summary
+                summary_data.append({
+                    'Category': category_name,
+                    'Mean': f'{filt_mean:.3f}',  # Use filtered mean as main mean
+                    'Std Dev': f'{filt_std:.3f}',  # Use filtered std as main std
+                    'Count': f'{filt_count}/{total_trials} ({(filt_count/total_trials*100):.2f}%)',  # Main count column for backward compatibility
+                    'Original_Mean': f'{orig_mean:.3f}',
+                    'Original_Std': f'{orig_std:.3f}',
+                    'Filtered_Mean': f'{filt_mean:.3f}',
+                    'Filtered_Std': f'{filt_std:.3f}',
+                    'Filtered_Count': f'{filt_count}/{total_trials} ({(filt_count/total_trials*100):.2f}%)',
+                    'Count_Value': int(filt_count)  # Numeric filtered count for totals
+                })
+            summaries.append(pd.DataFrame(summary_data))
+        
+        return summaries
     
     def _initialize_trial_logger(self, method):
         """
@@ -402,34 +658,54 @@ class AssessmentClassifier:
                 writer = csv.writer(f)
                 writer.writerow(['timestamp', 'trial_number', 'stimulus_code', 'condition', 'erd_value'])
             print(f"Trial Logger initialized. Logging to: {self.trial_log_filepath}")
+            self.trial_log_enabled = True
         except IOError as e:
             print(f"Error: Could not initialize trial log file {self.trial_log_filepath}. Details: {e}")
             self.trial_log_filepath = None
+            self.trial_log_enabled = False
 
-    def _log_trial_erd(self, trial_number, stimulus_code, erd_value):
+    def _log_trial_erds(self, stimulus_codes, erd_values):
         """
-        Log ERD data for a single trial.
+        Log ERD data for a run of trials with a single open and write.
         
         Args:
-            trial_number (int): Sequential trial number
-            stimulus_code (int): Stimulus code (1-7)
-            erd_value (float): Calculated ERD value
+            stimulus_codes (list): Stimulus code (1-7) per trial, in trial order
+            erd_values (list): Calculated ERD value per trial
         """
-        if not hasattr(self, 'trial_log_filepath') or not self.trial_log_filepath:
+        if not self.trial_log_enabled:
             return  # Skip if initialization failed
-            
-        # Map stimulus code to condition name
-        condition_map = {1: 'thumb', 2: 'index', 3: 'middle', 4: 'ring', 5: 'pinky', 6: 'sixth', 7: 'blank'}
-        condition = condition_map.get(stimulus_code, f'unknown({stimulus_code})')
+        
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            # Map stimulus code to condition name
+            [timestamp, trial_number, stimulus_code, _CONDITION_NAMES.get(stimulus_code, f'unknown({stimulus_code})'), erd_value]
+            for trial_number, (stimulus_code, erd_value) in enumerate(zip(stimulus_codes, erd_values), start=1)
+        ]
         
         try:
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
             with open(self.trial_log_filepath, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([timestamp, trial_number, stimulus_code, condition, erd_value])
+                csv.writer(f).writerows(rows)
         except IOError as e:
             print(f"Error: Could not write trial ERD data to {self.trial_log_filepath}. Details: {e}")
     
+    def _calculate_method_erd(self, method):
+        """
+        Calculate ERD values for all markers with one method, using the configured
+        moving average parameters for the moving average method.
+        
+        Returns:
+            tuple: (results DataFrame, float64 ERD value per row)
+        """
+        if method == "moving_average":
+            # Special parameters for moving average method
+            return self._calculate_erd(
+                method="moving_average",
+                moving_average_window_size=self.config.MOVING_AVERAGE_WINDOW_SIZE,
+                moving_average_method=self.config.MOVING_AVERAGE_METHOD
+            )
+        # Standard methods
+        return self._calculate_erd(method=method)
+    
     def run_analysis(self):
         """
         Run the complete ERD analysis pipeline for all configured methods.
@@ -441,50 +717,56 @@ class AssessmentClassifier:
         
         all_results = {}
         
+        # Gather and filter the epochs once; every method below reduces the shared arrays
+        self._gather_epochs()
+        if any(m in self.config.ERD_METHODS for m in ('bandpass', 'db_correction', 'moving_average')):
+            self._get_filtered_epochs()
+        
+        # The methods only read the shared epochs, so they can run side by side on threads
+        # (the SciPy and NumPy kernels release the GIL); results are reported in method order.
+        # Not with NUMBA_PARALLEL: Numba's default workqueue threading layer aborts when two
+        # threads launch parallel kernels at once, and those kernels already use every core.
+        method_results = None
+        if self.config.PARALLEL_METHODS and not self.config.NUMBA_PARALLEL and len(self.config.ERD_METHODS) > 1:
+            with ThreadPoolExecutor(max_workers=len(self.config.ERD_METHODS)) as executor:
+                method_results = dict(zip(self.config.ERD_METHODS,
+                                          executor.map(self._calculate_method_erd, self.config.ERD_METHODS)))
+        
         # Loop through each ERD computation method
         for method_name in self.config.ERD_METHODS:
             print(f"\n## Analysis for Method: '{method_name.capitalize()}'")
             print("-" * (len(method_name) + 26))
             
             # Calculate ERD values
-            if method_name == "moving_average":
-                # Special parameters for moving average method
-                results = self.calculate_erd_for_all_markers(
-                    method="moving_average",
-                    moving_average_window_size=self.config.MOVING_AVERAGE_WINDOW_SIZE,
-                    moving_average_method=self.config.MOVING_AVERAGE_METHOD
-                )
+            if method_results is not None:
+                results_df, erd_values = method_results[method_name]
             else:
-                # Standard methods
-                results = self.calculate_erd_for_all_markers(method=method_name)
-            
-            # Convert to DataFrame
-            results_df = pd.DataFrame(results)
+                results_df, erd_values = self._calculate_method_erd(method_name)
             
             if len(results_df) == 0:
                 print("No valid ERD results obtained for this method.")
                 continue
             
-            # Generate summary statistics with both static and dynamic boundaries
+            # Calculate dynamic REST boundary, then both static and dynamic summaries in one pass
+            rest_boundary = self.calculate_rest_boundary(results_df, target_value='erd_value')
+            summary_df_static, summary_df = self.get_summaries(results_df, [0, rest_boundary], target_value='erd_value')
+            
             print("\n--- Static Boundary Analysis (boundary=0) ---")
-            summary_df_static = self.get_summary(results_df, boundary=0, target_value='erd_value')
             print(summary_df_static.to_string(index=False))
             
-            # Calculate dynamic REST boundary and generate summary
-            rest_boundary = self.calculate_rest_boundary(results_df, target_value='erd_value')
             print(f"\n--- Dynamic REST Boundary Analysis (boundary={rest_boundary:.3f}) ---")
-            summary_df = self.get_summary(results_df, boundary=rest_boundary, target_value='erd_value')
             
             # Print formatted summary
             print(summary_df.to_string(index=False))
             
             # Print total count
-            total_count = summary_df['Count'].apply(lambda x: int(x.split('/')[0])).sum()
+            total_count = int(summary_df['Count_Value'].sum())
             print(f"Total: {total_count}")
             
             # Store results for potential further analysis
             all_results[method_name] = {
                 'results_df': results_df,
+                'erd_values': erd_values,
                 'summary_df_static': summary_df_static,
                 'summary_df_rest': summary_df,
                 'rest_boundary': rest_boundary
@@ -496,12 +778,15 @@ class AssessmentClassifier:
         
         return all_results
     
-    def run_single_method_analysis(self, method='moving_average'):
+    def run_single_method_analysis(self, method='moving_average', precomputed=None):
         """
         Run analysis for a single ERD method and return detailed results.
         
         Args:
             method (str): ERD method to use
+            precomputed (dict, optional): This method's entry of run_analysis results; its
+                                          ERD values and summaries are reported instead of
+                                          being recomputed
             
         Returns:
             dict: Dictionary containing results DataFrame and summary DataFrame
@@ -511,34 +796,34 @@ class AssessmentClassifier:
         # Initialize trial logger for this method
         self._initialize_trial_logger(method)
         
-        if method == "moving_average":
-            results = self.calculate_erd_for_all_markers(
-                method="moving_average",
-                moving_average_window_size=self.config.MOVING_AVERAGE_WINDOW_SIZE,
-                moving_average_method=self.config.MOVING_AVERAGE_METHOD
-            )
+        if precomputed is not None:
+            results_df = precomputed['results_df']
+            # Logged from the float64 values, as a single-method run logs them
+            self._log_trial_erds(results_df['stimulus'].tolist(), precomputed['erd_values'].tolist())
         else:
-            results = self.calculate_erd_for_all_markers(method=method)
-        
-        results_df = pd.DataFrame(results)
+            results_df, _ = self._calculate_method_erd(method)
         
         if len(results_df) == 0:
             print("No valid ERD results obtained.")
             return None
         
-        # Generate summary with both static and dynamic boundaries
+        if precomputed is not None:
+            rest_boundary = precomputed['rest_boundary']
+            summary_df_static = precomputed['summary_df_static']
+            summary_df = precomputed['summary_df_rest']
+        else:
+            # Calculate dynamic REST boundary, then both static and dynamic summaries in one pass
+            rest_boundary = self.calculate_rest_boundary(results_df, target_value='erd_value')
+            summary_df_static, summary_df = self.get_summaries(results_df, [0, rest_boundary], target_value='erd_value')
+        
         print("\n--- Static Boundary Analysis (boundary=0) ---")
-        summary_df_static = self.get_summary(results_df, boundary=0, target_value='erd_value')
         print(summary_df_static.to_string(index=False))
         
-        # Calculate dynamic REST boundary and generate summary
-        rest_boundary = self.calculate_rest_boundary(results_df, target_value='erd_value')
         print(f"\n--- Dynamic REST Boundary Analysis (boundary={rest_boundary:.3f}) ---")
-        summary_df = self.get_summary(results_df, boundary=rest_boundary, target_value='erd_value')
         
         print("\n--- Summary Results ---")
         print(summary_df.to_string(index=False))
-        total_count = summary_df['Count'].apply(lambda x: int(x.split('/')[0])).sum()
+        total_count = int(summary_df['Count_Value'].sum())
         print(f"Total: {total_count}")
         
         return {
@@ -567,16 +852,7 @@ class AssessmentClassifier:
         # Initialize trial logger for this method
         self._initialize_trial_logger(method)
         
-        if method == "moving_average":
-            results = self.calculate_erd_for_all_markers(
-                method="moving_average",
-                moving_average_window_size=self.config.MOVING_AVERAGE_WINDOW_SIZE,
-                moving_average_method=self.config.MOVING_AVERAGE_METHOD
-            )
-        else:
-            results = self.calculate_erd_for_all_markers(method=method)
-        
-        results_df = pd.DataFrame(results)
+        results_df, _ = self._calculate_method_erd(method)
         
         if len(results_df) == 0:
             print("No valid ERD results obtained.")
@@ -590,7 +866,7 @@ class AssessmentClassifier:
         summary_df = self.get_summary(results_df, boundary=rest_boundary, target_value='erd_value')
         
         print(summary_df.to_string(index=False))
-        total_count = summary_df['Count'].apply(lambda x: int(x.split('/')[0])).sum()
+        total_count = int(summary_df['Count_Value'].sum())
         print(f"Total: {total_count}")
         
         print(f"\nNote: Motor imagery trials compared against participant's REST average ({rest_boundary:.3f})")
@@ -618,36 +894,26 @@ class AssessmentClassifier:
         # Initialize trial logger for this method
         self._initialize_trial_logger(method)
         
-        if method == "moving_average":
-            results = self.calculate_erd_for_all_markers(
-                method="moving_average",
-                moving_average_window_size=self.config.MOVING_AVERAGE_WINDOW_SIZE,
-                moving_average_method=self.config.MOVING_AVERAGE_METHOD
-            )
-        else:
-            results = self.calculate_erd_for_all_markers(method=method)
-        
-        results_df = pd.DataFrame(results)
+        results_df, _ = self._calculate_method_erd(method)
         
         if len(results_df) == 0:
             print("No valid ERD results obtained.")
             return None
         
-        # Calculate REST boundary
+        # Calculate REST boundary, then the summaries for both boundaries in one pass
         rest_boundary = self.calculate_rest_boundary(results_df, target_value='erd_value')
+        summary_static, summary_rest = self.get_summaries(results_df, [0, rest_boundary], target_value='erd_value')
         
         # Analysis with boundary=0
         print("\n--- BOUNDARY = 0 (Static Threshold) ---")
-        summary_static = self.get_summary(results_df, boundary=0, target_value='erd_value')
         print(summary_static.to_string(index=False))
-        total_static = summary_static['Count'].apply(lambda x: int(x.split('/')[0])).sum()
+        total_static = int(summary_static['Count_Value'].sum())
         print(f"Total: {total_static}")
         
         # Analysis with REST boundary
         print(f"\n--- BOUNDARY = {rest_boundary:.3f} (REST-based Threshold) ---")
-        summary_rest = self.get_summary(results_df, boundary=rest_boundary, target_value='erd_value')
         print(summary_rest.to_string(index=False))
-        total_rest = summary_rest['Count'].apply(lambda x: int(x.split('/')[0])).sum()
+        total_rest = int(summary_rest['Count_Value'].sum())
         print(f"Total: {total_rest}")
         
         print(f"\n--- COMPARISON SUMMARY ---")
@@ -716,20 +982,36 @@ All Methods Analysis:
 Custom Data Directory:
     python assessment_classifier.py -p john --data_dir ./custom/path/
 
+Several Participants in Parallel (one process per participant):
+    python assessment_classifier.py --participants randy,john,mary --workers 3
+
 DEFAULTS:
 - Method: all (runs all ERD calculation methods)
 - Boundary: Static boundary=0
 - Data Directory: ./data/rawdata/
+- Cache Directory: ./data/cache/
 - Moving Average Window: 100 samples
         """
     )
     
-    parser.add_argument(
+    participant_group = parser.add_mutually_exclusive_group(required=True)
+    participant_group.add_argument(
         '-p', '--participant',
         type=str,
-        required=True,
         help='Participant identifier (used for file naming, e.g., "randy" for randy.vhdr)'
     )
+    participant_group.add_argument(
+        '--participants',
+        type=str,
+        help='Comma-separated participant identifiers, analyzed in parallel worker processes'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help='Number of worker processes for --participants (default: half the CPU cores)'
+    )
     
     parser.add_argument(
         '-d', '--data_dir',
@@ -738,6 +1020,13 @@ DEFAULTS:
         help='Base directory containing participant data folders (default: ./data/rawdata/)'
     )
     
+    parser.add_argument(
+        '--cache_dir',
+        type=str,
+        default='./data/cache/',
+        help='Directory for cached raw data and epochs (default: ./data/cache/)'
+    )
+    
     parser.add_argument(
         '-m', '--method',
         type=str,
@@ -762,6 +1051,71 @@ DEFAULTS:
     return parser.parse_args()
 
 
+def analyze_participant(participant, args):
+    """
+    Load one participant's recording and run the analysis selected by the command-line arguments.
+    
+    Args:
+        participant (str): Participant identifier
+        args (argparse.Namespace): Parsed command-line arguments
+        
+    Returns:
+        The results of the selected analysis
+    """
+    # Initialize configuration with runtime parameters
+    config = AssessmentConfig(
+        participant=participant,
+        data_dir=args.data_dir,
+        cache_dir=args.cache_dir
+    )
+    
+    # Update moving average window size if specified
+    config.MOVING_AVERAGE_WINDOW_SIZE = args.window_size
+    
+    # Create classifier instance
+    classifier = AssessmentClassifier(config)
+    
+    # Load and prepare data
+    classifier.load_data()
+    
+    # Run analysis based on specified method
+    if args.method == 'compare':
+        # Run comparative analysis showing both boundaries
+        results = classifier.run_comparative_analysis('moving_average')
+        return results
+    elif args.method == 'all':
+        # Run complete analysis with all methods
+        all_results = classifier.run_analysis()
+        
+        # Also run detailed analysis for moving average method
+        print("\n" + "="*60)
+        print("=== DETAILED MOVING AVERAGE ANALYSIS ===")
+        print("="*60)
+        # run_analysis already computed the moving average ERDs; only report them again
+        detailed_results = classifier.run_single_method_analysis('moving_average',
+                                                                 precomputed=all_results.get('moving_average'))
+        
+        return all_results, detailed_results
+    else:
+        # Run analysis for single method
+        if args.use_rest_boundary:
+            results = classifier.run_single_method_analysis_rest_only(args.method)
+        else:
+            results = classifier.run_single_method_analysis(args.method)
+        return results
+
+
+def _analyze_participant_worker(participant, args):
+    """
+    Worker process entry point: a failing participant is reported without stopping the others.
+    """
+    try:
+        return analyze_participant(participant, args)
+    except Exception as e:
+        print(f"Error during analysis of participant '{participant}': {e}")
+        return None
+
+
 def main():
     """
     Main execution function for the assessment classifier.
@@ -771,49 +1125,22 @@ def main():
         args = parse_arguments()
         
         print(f"=== Motor Imagery EEG Assessment Classifier ===")
-        print(f"Participant: {args.participant}")
+        if args.participants:
+            participants = [p.strip() for p in args.participants.split(',') if p.strip()]
+            print(f"Participants: {', '.join(participants)} ({args.workers} workers)")
+        else:
+            print(f"Participant: {args.participant}")
         print(f"Data Directory: {args.data_dir}")
         print(f"Method: {args.method}")
         print(f"Use REST Boundary: {args.use_rest_boundary}")
         
-        # Initialize configuration with runtime parameters
-        config = AssessmentConfig(
-            participant=args.participant,
-            data_dir=args.data_dir
-        )
-        
-        # Update moving average window size if specified
-        config.MOVING_AVERAGE_WINDOW_SIZE = args.window_size
+        if not args.participants:
+            return analyze_participant(args.participant, args)
         
-        # Create classifier instance
-        classifier = AssessmentClassifier(config)
-        
-        # Load and prepare data
-        classifier.load_data()
-        
-        # Run analysis based on specified method
-        if args.method == 'compare':
-            # Run comparative analysis showing both boundaries
-            results = classifier.run_comparative_analysis('moving_average')
-            return results
-        elif args.method == 'all':
-            # Run complete analysis with all methods
-            all_results = classifier.run_analysis()
-            
-            # Also run detailed analysis for moving average method
-            print("\n" + "="*60)
-            print("=== DETAILED MOVING AVERAGE ANALYSIS ===")
-            print("="*60)
-            detailed_results = classifier.run_single_method_analysis('moving_average')
-            
-            return all_results, detailed_results
-        else:
-            # Run analysis for single method
-            if args.use_rest_boundary:
-                results = classifier.run_single_method_analysis_rest_only(args.method)
-            else:
-                results = classifier.run_single_method_analysis(args.method)
-            return results
+        # Participants are independent, so each one is loaded and analyzed in its own process
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = executor.map(_analyze_participant_worker, participants, [args] * len(participants))
+            return dict(zip(participants, results))
         
     except Exception as e:
         print(f"Error during analysis: {e}")
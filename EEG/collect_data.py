@@ -1,18 +1,30 @@
 import numpy as np
 import time
+import os
 import socket
 import json
+import queue
+import threading
 from collections import deque
-import pandas as pd
-from scipy.signal import butter, filtfilt
+import csv
+from scipy.signal import butter, sosfiltfilt, zpk2sos
 import mne
 from colorama import Fore, Style
 import argparse
 
+# orjson is optional: it serializes the broadcast messages straight to bytes, NumPy scalars
+# included; the standard json module is used without it
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from utils.livestream_receiver import LivestreamReceiver, Marker
 from utils.emulator import Emulator
 
 from ERDCalculator.ERDCalculator import ERDCalculator
+from ERDCalculator.erd_kernels import NUMBA_AVAILABLE, band_power_batch
 
 
 # --- Configuration Class ---
@@ -28,8 +40,9 @@ class EEGConfig:
 
         # Signal Processing Parameters
         self.FOCUS_CHANNEL_NAMES = ["C3", "C1", "CP3", "CP1"]  # Motor cortex channels (name-based)
-        self.FOCUS_MARKERS = ['S  1', 'S  2', 'S  3', 'S  4', 'S  5', 'S  6', 'S  7']
-        self.BAD_CHANNELS = ['FT9', 'TP9', 'FT10', 'TP10']  # Channels to exclude from analysis
+        # Sets: both are only used for membership tests on incoming markers and channel names
+        self.FOCUS_MARKERS = frozenset({'S  1', 'S  2', 'S  3', 'S  4', 'S  5', 'S  6', 'S  7'})
+        self.BAD_CHANNELS = frozenset({'FT9', 'TP9', 'FT10', 'TP10'})  # Channels to exclude from analysis
         self.LOW_CUT = 8.0 # Hz (alpha band)
         self.HIGH_CUT = 30.0 # Hz (alpha band)
         self.FILTER_ORDER = 5
@@ -41,6 +54,9 @@ class EEGConfig:
         # Buffer and Streaming Parameters
         self.MAX_STREAM_DURATION_SECONDS = 120
 
+        # Saving Parameters
+        self.CREATE_MNE_RAW = False  # If True, wrap the saved session in an MNE Raw object on cleanup
+
         # Broadcasting Configuration
         self.ENABLE_BROADCASTING = True
         self.BROADCAST_IP = "127.0.0.1"
@@ -113,43 +129,55 @@ class DataProcessor:
         self.config = config
         self.sampling_frequency = sampling_frequency
         self.channel_count = channel_count
-        # Design bandpass filter
-        self.b, self.a = butter(self.config.FILTER_ORDER,
-                                [self.config.LOW_CUT, self.config.HIGH_CUT],
-                                btype='band', fs=self.sampling_frequency)
+        # Design bandpass filter from its poles and zeros, refusing configurations whose poles
+        # fall on or outside the unit circle, then keep it as second-order sections
+        z, p, k = butter(self.config.FILTER_ORDER,
+                         [self.config.LOW_CUT, self.config.HIGH_CUT],
+                         btype='band', fs=self.sampling_frequency, output='zpk')
+        if not np.all(np.abs(p) < 1):
+            raise ValueError(f"Bandpass filter {self.config.LOW_CUT}-{self.config.HIGH_CUT} Hz (order {self.config.FILTER_ORDER}) is unstable at {self.sampling_frequency} Hz")
+        self.sos = zpk2sos(z, p, k)
         
         # Calculate number of samples before and after marker for epoching
         self.samples_before_marker = int(self.config.SECONDS_BEFORE_MARKER * self.sampling_frequency)
         self.samples_after_marker = int(self.config.SECONDS_AFTER_MARKER * self.sampling_frequency)
         self.epoch_total_samples = self.samples_before_marker + 1 + self.samples_after_marker
+        self.epoch_shape = (self.channel_count, self.epoch_total_samples)
 
     def calculate_erd(self, epoch_data):
         """
         Calculates ERD% for a given epoch of EEG data.
         Returns the average ERD% across focus channels, or 0 if invalid.
         """
-        if epoch_data.shape != (self.channel_count, self.epoch_total_samples) or np.isnan(epoch_data).all() or np.all(np.isnan(epoch_data), axis=1).any():
-            print(f"⚠️ Epoch data invalid for ERD calculation. Shape: {epoch_data.shape}, NaNs: {np.isnan(epoch_data).all()}")
+        # One NaN scan: an all-NaN epoch also has an all-NaN channel
+        nan_mask = np.isnan(epoch_data)
+        if epoch_data.shape != self.epoch_shape or nan_mask.all(axis=1).any():
+            print(f"⚠️ Epoch data invalid for ERD calculation. Shape: {epoch_data.shape}, NaNs: {nan_mask.all()}")
             return None
 
-        filtered_epoch = filtfilt(self.b, self.a, epoch_data, axis=1)
+        filtered_epoch = sosfiltfilt(self.sos, epoch_data, axis=1)
 
-        pre = filtered_epoch[:, :self.samples_before_marker]
-        post = filtered_epoch[:, self.samples_before_marker + 1:]
+        if NUMBA_AVAILABLE:
+            # Mean pre and post power (NaN samples skipped) in one compiled pass
+            R, A = band_power_batch(filtered_epoch[None], self.samples_before_marker, self.samples_before_marker + 1)
+            R, A = R[0], A[0]
+        else:
+            pre = filtered_epoch[:, :self.samples_before_marker]
+            post = filtered_epoch[:, self.samples_before_marker + 1:]
 
-        pre_power = pre ** 2
-        post_power = post ** 2
+            pre_power = pre ** 2
+            post_power = post ** 2
 
-        # Handle potential division by zero by using np.nanmean and filtering
-        R = np.nanmean(pre_power, axis=1)
-        A = np.nanmean(post_power, axis=1)
+            # Handle potential division by zero by using np.nanmean and filtering
+            R = np.nanmean(pre_power, axis=1)
+            A = np.nanmean(post_power, axis=1)
 
         erd_percent = np.zeros_like(R, dtype=float)
         # Only calculate for channels where R (reference power) is not zero
         non_zero_R_indices = R != 0
         erd_percent[non_zero_R_indices] = ((A[non_zero_R_indices] - R[non_zero_R_indices]) / R[non_zero_R_indices]) * 100
         # For channels where R is zero, set ERD to NaN (or 0, depending on desired behavior)
-        erd_percent[R == 0] = np.nan
+        erd_percent[~non_zero_R_indices] = np.nan
 
         erd_percent_focus = erd_percent[self.config.FOCUS_CHANNELS]
         print(Fore.RED + f"       ERD% per focus channel: {erd_percent_focus}" + Style.RESET_ALL)
@@ -171,6 +199,10 @@ class ERDBroadcaster:
         self.config = config
         self.server_socket = None
         self.client_connection = None
+        # Messages are newline-delimited; where sendmsg exists (not on Windows) the message and
+        # the separator go out in one gather write instead of being concatenated first
+        self._sep = b"\n"
+        self._gather_send = hasattr(socket.socket, 'sendmsg')
 
     def initialize(self):
         """
@@ -198,6 +230,9 @@ class ERDBroadcaster:
         if self.server_socket and self.client_connection is None:
             try:
                 conn, addr = self.server_socket.accept()
+                # Send each small ERD message immediately instead of letting Nagle's algorithm
+                # hold it back waiting for more data
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 self.client_connection = conn
                 print(f"Accepted broadcasting connection from {addr}")
             except socket.timeout:
@@ -211,8 +246,17 @@ class ERDBroadcaster:
         """
         if self.client_connection:
             try:
-                message = json.dumps(data) + "\n"
-                self.client_connection.sendall(message.encode('utf-8'))
+                if ORJSON_AVAILABLE:
+                    message = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+                else:
+                    message = json.dumps(data).encode('utf-8')
+                if self._gather_send:
+                    sent = self.client_connection.sendmsg([message, self._sep])
+                    if sent < len(message) + len(self._sep):
+                        # Partial write: send whatever is left of the message and separator
+                        self.client_connection.sendall((message + self._sep)[sent:])
+                else:
+                    self.client_connection.sendall(message + self._sep)
                 # print(f"Successfully broadcasted: {len(message)} bytes")
             except BrokenPipeError:
                 print("Client disconnected, resetting connection.")
@@ -254,7 +298,6 @@ class DataSaver:
         """
         if filename is None:
             import time
-            import os
             os.makedirs("eeg_data", exist_ok=True)
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             filename = f"./eeg_data/collected_eeg_data_{timestamp}.npy"
@@ -268,26 +311,52 @@ class DataSaver:
             print("\nNo EEG data was collected to save.")
             return None
 
+    def save_streamed_eeg_data(self, stream_path, channel_count, filename=None):
+        """
+        Saves EEG data streamed to a raw sample file (float64, one row of channels per sample)
+        to a .npy file with timestamp, then removes the stream file.
+        The samples are transposed into the .npy block by block through memory maps, so
+        saving never holds the whole session in memory.
+        Returns the saved EEG data (channels x samples) as a read-only memory map of the .npy file.
+        """
+        if filename is None:
+            import time
+            os.makedirs("eeg_data", exist_ok=True)
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            filename = f"./eeg_data/collected_eeg_data_{timestamp}.npy"
+        n_samples = os.path.getsize(stream_path) // (8 * channel_count)
+        if n_samples:
+            stream = np.memmap(stream_path, dtype=np.float64, mode='r', shape=(n_samples, channel_count))
+            saved = np.lib.format.open_memmap(filename, mode='w+', dtype=np.float64, shape=(channel_count, n_samples))
+            block_samples = 1 << 16
+            for start in range(0, n_samples, block_samples):
+                saved[:, start:start + block_samples] = stream[start:start + block_samples].T
+            saved.flush()
+            # Drop the maps so both files are closed (the stream file can then be removed on Windows)
+            del stream, saved
+            final_eeg_data = np.load(filename, mmap_mode='r')
+            print(f"\nTotal collected EEG data shape: {final_eeg_data.shape}")
+            print(f"Data saved to {filename}")
+        else:
+            final_eeg_data = None
+            print("\nNo EEG data was collected to save.")
+        os.remove(stream_path)
+        return final_eeg_data
+
     def save_markers(self, all_markers, filename=None):
         """
         Saves all collected markers to a CSV file with timestamp.
         """
         if filename is None:
             import time
-            import os
             os.makedirs("eeg_data", exist_ok=True)
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             filename = f"./eeg_data/collected_markers_{timestamp}.csv"
         if all_markers:
-            markers_data = []
-            for marker in all_markers:
-                markers_data.append({
-                    'description': marker.description,
-                    'position': marker.position,
-                    'channel': marker.channel
-                })
-            markers_df = pd.DataFrame(markers_data)
-            markers_df.to_csv(filename, index=False)
+            with open(filename, 'w', newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerow(['description', 'position', 'channel'])
+                writer.writerows((marker.description, marker.position, marker.channel) for marker in all_markers)
             print(f"Markers saved to {filename}")
         else:
             print("No markers were collected to save.")
@@ -321,7 +390,10 @@ class EEGDataCollector:
         self.data_processor = None # Initialized after connection to get sfreq, n_channels
         self.file_base_name = file_base_name
 
-        self.all_eeg_data = []
+        # Incoming chunks are written to a raw sample file as they arrive instead of being
+        # kept in memory for the whole session; see DataSaver.save_streamed_eeg_data
+        self.eeg_stream_path = None
+        self.eeg_stream_file = None
         self.all_markers = []
         self.live_eeg_buffer = None
         self.buffer_write_idx = 0
@@ -331,6 +403,11 @@ class EEGDataCollector:
         # Channel mapping for bad channel exclusion
         self.clean_channel_names = None
         self.clean_to_original_mapping = None
+        self.clean_channel_indices = None
+
+        # Extracted epochs are queued to a background thread for ERD calculation and broadcasting
+        self._erd_q = queue.SimpleQueue()
+        self._erd_thread = None
 
     def run(self):
         """
@@ -351,6 +428,8 @@ class EEGDataCollector:
             if ch_name not in self.config.BAD_CHANNELS:
                 self.clean_to_original_mapping[clean_idx] = orig_idx
                 clean_idx += 1
+        # Original indices of the clean channels in order, to gather them in one indexing step
+        self.clean_channel_indices = np.fromiter(self.clean_to_original_mapping.values(), dtype=np.intp)
         
         # Map focus channel names to clean channel indices (same as assessment classifier)
         focus_channels_clean = []
@@ -377,7 +456,19 @@ class EEGDataCollector:
         # Calculate buffer size based on processing needs
         buffer_duration_seconds = max(10.0, (self.config.SECONDS_BEFORE_MARKER + self.config.SECONDS_AFTER_MARKER) * 1.5)
         buffer_samples = int(buffer_duration_seconds * self.receiver.sampling_frequency)
-        self.live_eeg_buffer = np.full((self.receiver.channel_count, buffer_samples), np.nan)
+        # Mirrored circular buffer: every sample is stored twice, buffer_samples apart, so any
+        # window of up to buffer_samples starting in the first half is one contiguous slice.
+        # float32 is ample for EEG samples and keeps epochs on the float32 filter/kernel paths;
+        # the chunks saved to disk keep their original precision.
+        self.live_eeg_buffer = np.full((self.receiver.channel_count, 2 * buffer_samples), np.nan, dtype=np.float32)
+
+        self._erd_thread = threading.Thread(target=self._erd_worker, daemon=True)
+        self._erd_thread.start()
+
+        os.makedirs("eeg_data", exist_ok=True)
+        stream_name = self.file_base_name if self.file_base_name else time.strftime("%Y%m%d_%H%M%S")
+        self.eeg_stream_path = f"./eeg_data/{stream_name}_stream.tmp"
+        self.eeg_stream_file = open(self.eeg_stream_path, 'wb')
 
         input("Press Enter to start data collection...")
         print("Starting data collection loop (Press Ctrl+C to stop)...")
@@ -391,18 +482,16 @@ class EEGDataCollector:
                 data_chunk, markers = self.receiver.get_data()
 
                 if data_chunk is not None and data_chunk.shape[1] > 0: # Ensure chunk is not empty
-                    self.all_eeg_data.append(data_chunk)
+                    np.ascontiguousarray(data_chunk.T, dtype=np.float64).tofile(self.eeg_stream_file)
                     num_samples_in_chunk = data_chunk.shape[1]
-                    # Add new data to the circular buffer
+                    # Add new data to the circular buffer and to its mirror copy
                     start_idx = self.buffer_write_idx
                     end_idx = start_idx + num_samples_in_chunk
-                    if end_idx <= buffer_samples:
-                        self.live_eeg_buffer[:, start_idx:end_idx] = data_chunk
-                    else: # Wraps around
-                        part1_len = buffer_samples - start_idx
-                        self.live_eeg_buffer[:, start_idx:buffer_samples] = data_chunk[:, :part1_len]
-                        part2_len = num_samples_in_chunk - part1_len
-                        self.live_eeg_buffer[:, :part2_len] = data_chunk[:, part1_len:]
+                    self.live_eeg_buffer[:, start_idx:end_idx] = data_chunk
+                    first_half_len = min(end_idx, buffer_samples) - start_idx
+                    self.live_eeg_buffer[:, start_idx + buffer_samples:start_idx + buffer_samples + first_half_len] = data_chunk[:, :first_half_len]
+                    # Samples that ran past the first half wrap around to its start
+                    self.live_eeg_buffer[:, :num_samples_in_chunk - first_half_len] = data_chunk[:, first_half_len:]
 
                     self.buffer_write_idx = end_idx % buffer_samples
                     self.total_samples_streamed += num_samples_in_chunk
@@ -411,11 +500,14 @@ class EEGDataCollector:
                     if markers:
                         print(f"Received {len(markers)} markers in this chunk:")                        
                         
+                        # Marker positions relative to the start of the entire stream
+                        chunk_start_pos = self.total_samples_streamed - num_samples_in_chunk
+                        for marker_obj in markers:
+                            marker_obj.position += chunk_start_pos
+                        self.all_markers.extend(markers)
+
                         for marker_obj in markers:
-                            # Marker position relative to the start of the entire stream
-                            marker_stream_pos = self.total_samples_streamed - num_samples_in_chunk + marker_obj.position
-                            markers[0].position = marker_stream_pos
-                            self.all_markers.extend(markers)
+                            marker_stream_pos = marker_obj.position
                             if marker_obj.description in self.config.FOCUS_MARKERS:
                                 self.pending_markers_to_process.append({
                                     'marker_obj': marker_obj,
@@ -442,126 +534,144 @@ class EEGDataCollector:
         Checks if enough data is available in the buffer for each pending marker,
         extracts the corresponding epoch, and performs live ERD calculation and broadcasting.
         """
-        processed_markers_this_iteration = []
-        for i in range(len(self.pending_markers_to_process)):
-            pending_marker = self.pending_markers_to_process[i]
+        oldest_sample_in_buffer_stream_pos = max(0, self.total_samples_streamed - buffer_samples)
+
+        # Markers are queued in stream order, so they become ready in that order too:
+        # process them from the front until one still lacks its post-stimulus data
+        while self.pending_markers_to_process:
+            pending_marker = self.pending_markers_to_process[0]
             marker_stream_pos = pending_marker['stream_pos']
 
-            oldest_sample_in_buffer_stream_pos = max(0, self.total_samples_streamed - buffer_samples)
             required_epoch_end_stream_pos = marker_stream_pos + self.data_processor.samples_after_marker
+            if required_epoch_end_stream_pos >= self.total_samples_streamed:
+                break
+            self.pending_markers_to_process.popleft()
+
+            # Prune old unprocessable markers whose baseline has already left the buffer
+            if (marker_stream_pos - self.data_processor.samples_before_marker) < oldest_sample_in_buffer_stream_pos:
+                print(f"  Pruned old unprocessable marker: '{pending_marker['description']}' (stream pos: {marker_stream_pos})")
+                continue
+
+            # Extract epoch data from the circular buffer
+            epoch_start_stream_pos = marker_stream_pos - self.data_processor.samples_before_marker
+            
+            # Calculate relative index in the circular buffer
+            # This needs careful handling for wrap-around.
+            # The total_samples_streamed - buffer_samples represents the stream_pos of the first sample in the buffer
+            
+
+            #ADD SNIPPET
+            offset_from_buffer_start = epoch_start_stream_pos - oldest_sample_in_buffer_stream_pos
+            relative_epoch_start_in_buffer = (self.buffer_write_idx + int(offset_from_buffer_start)) % buffer_samples
+            #END SNIPPET
+            #relative_epoch_start_in_buffer = (epoch_start_stream_pos - oldest_sample_in_buffer_stream_pos + self.buffer_write_idx - self.total_samples_streamed + buffer_samples) % buffer_samples
+            
+            # Extract epoch data for all channels first. The mirror half holds the samples
+            # after the buffer end, so the epoch is one slice even when it wraps around.
+            full_epoch_data = self.live_eeg_buffer[:, relative_epoch_start_in_buffer : relative_epoch_start_in_buffer + self.data_processor.epoch_total_samples]
+            
+            # Remove bad channels from epoch data (fancy indexing gives a contiguous copy,
+            # owned by the queued epoch)
+            epoch_data = full_epoch_data[self.clean_channel_indices]
+
+            # Hand the epoch to the ERD worker thread so filtering and broadcasting never
+            # hold up reading the stream
+            print(f"       Epoch extracted for '{pending_marker['description']}'. Shape: {epoch_data.shape}. Performing live calculations...")
+            self._erd_q.put((pending_marker['description'], marker_stream_pos, epoch_data))
+
+
+    def _erd_worker(self):
+        """
+        Background loop computing and broadcasting the ERD of queued epochs.
+        A None item stops the worker.
+        """
+        while True:
+            item = self._erd_q.get()
+            if item is None:
+                break
+            try:
+                self._calculate_and_broadcast_erd(*item)
+            except Exception as e:
+                print(f"       Error during ERD calculation for '{item[0]}': {e}")
 
-            # Check if enough data is in buffer to extract the full epoch
-            if required_epoch_end_stream_pos < self.total_samples_streamed and \
-               (marker_stream_pos - self.data_processor.samples_before_marker) >= oldest_sample_in_buffer_stream_pos:
-
-                # Extract epoch data from the circular buffer
-                epoch_start_stream_pos = marker_stream_pos - self.data_processor.samples_before_marker
-                
-                # Calculate relative index in the circular buffer
-                # This needs careful handling for wrap-around.
-                # The total_samples_streamed - buffer_samples represents the stream_pos of the first sample in the buffer
-                
-
-                #ADD SNIPPET
-                offset_from_buffer_start = epoch_start_stream_pos - oldest_sample_in_buffer_stream_pos
-                relative_epoch_start_in_buffer = (self.buffer_write_idx + int(offset_from_buffer_start)) % buffer_samples
-                #END SNIPPET
-                #relative_epoch_start_in_buffer = (epoch_start_stream_pos - oldest_sample_in_buffer_stream_pos + self.buffer_write_idx - self.total_samples_streamed + buffer_samples) % buffer_samples
-                
-                # Extract epoch data for all channels first
-                full_epoch_data = np.full((self.receiver.channel_count, self.data_processor.epoch_total_samples), np.nan)
-
-                if relative_epoch_start_in_buffer + self.data_processor.epoch_total_samples <= buffer_samples:
-                    full_epoch_data = self.live_eeg_buffer[:, relative_epoch_start_in_buffer : relative_epoch_start_in_buffer + self.data_processor.epoch_total_samples]
-                else: # Epoch wraps around the buffer end
-                    part1_len = buffer_samples - relative_epoch_start_in_buffer
-                    full_epoch_data[:, :part1_len] = self.live_eeg_buffer[:, relative_epoch_start_in_buffer : buffer_samples]
-                    part2_len = self.data_processor.epoch_total_samples - part1_len
-                    full_epoch_data[:, part1_len:] = self.live_eeg_buffer[:, :part2_len]
-                
-                # Remove bad channels from epoch data
-                epoch_data = np.zeros((len(self.clean_channel_names), self.data_processor.epoch_total_samples))
-                for clean_idx, orig_idx in self.clean_to_original_mapping.items():
-                    epoch_data[clean_idx, :] = full_epoch_data[orig_idx, :]
-
-                # Perform live calculations
-                print(f"       Epoch extracted for '{pending_marker['description']}'. Shape: {epoch_data.shape}. Performing live calculations...")
-                
-                erd_results = self.data_processor.calculate_erd_moving_average(
-                    epoch_data, 
-                    window_size_samples=100,
-                    return_mean=True, 
-                    method='percentage'
-                )
-
-                # Also compute ERD using dB method
-                erd_results_db = self.data_processor.calculate_erd_moving_average(
-                    epoch_data,
-                    window_size_samples=100,
-                    return_mean=True,
-                    method='db'
-                )
-
-                if erd_results is not None:
-                    # Convert numpy types to Python types for JSON serialization
-                    if isinstance(erd_results, tuple):
-                        erd_mean, _ = erd_results
-                        erd_data = erd_mean
-                    else:
-                        erd_data = float(erd_results) if hasattr(erd_results, 'item') else erd_results
-
-                    # Prepare dB value similarly (default to None if unavailable)
-                    erd_db_value = None
-                    if erd_results_db is not None:
-                        if isinstance(erd_results_db, tuple):
-                            erd_db_mean, _ = erd_results_db
-                            erd_db_value = erd_db_mean
-                        else:
-                            erd_db_value = float(erd_results_db) if hasattr(erd_results_db, 'item') else erd_results_db
-                    
-                    data_to_send = {
-                        "timestamp": time.time(),
-                        "marker_description": pending_marker['description'],
-                        "marker_stream_pos": int(marker_stream_pos),
-                        "erd_percent": erd_data,
-                        "erd_db": erd_db_value,
-                        "channel_names": self.config.FOCUS_CHANNEL_NAMES
-                    }
-                    self.broadcaster.broadcast_data(data_to_send)
+    def _calculate_and_broadcast_erd(self, description, marker_stream_pos, epoch_data):
+        """
+        Performs the live ERD calculations for one extracted epoch and broadcasts the results.
+        """
+        # Filter and re-reference the epoch once; both ERD variants below reuse it
+        processed_epoch = self.data_processor.preprocess_epochs(epoch_data)
+
+        erd_results = self.data_processor.calculate_erd_moving_average(
+            processed_epoch, 
+            window_size_samples=100,
+            return_mean=True, 
+            method='percentage',
+            preprocessed=True
+        )
+
+        # Also compute ERD using dB method
+        erd_results_db = self.data_processor.calculate_erd_moving_average(
+            processed_epoch,
+            window_size_samples=100,
+            return_mean=True,
+            method='db',
+            preprocessed=True
+        )
+
+        if erd_results is not None:
+            # Convert numpy types to Python types for JSON serialization
+            if isinstance(erd_results, tuple):
+                erd_mean, _ = erd_results
+                erd_data = erd_mean
+            else:
+                erd_data = float(erd_results) if hasattr(erd_results, 'item') else erd_results
+
+            # Prepare dB value similarly (default to None if unavailable)
+            erd_db_value = None
+            if erd_results_db is not None:
+                if isinstance(erd_results_db, tuple):
+                    erd_db_mean, _ = erd_results_db
+                    erd_db_value = erd_db_mean
                 else:
-                    print(f"       ERD calculation for '{pending_marker['description']}' failed or resulted in None.")
-                
-                processed_markers_this_iteration.append(pending_marker)
-
-        # Remove processed markers from the deque
-        for pm in processed_markers_this_iteration:
-            self.pending_markers_to_process.remove(pm)
-
-        # Prune old unprocessable markers that are now too far behind the buffer
-        while self.pending_markers_to_process and \
-              (self.total_samples_streamed - buffer_samples) > (self.pending_markers_to_process[0]['stream_pos'] + self.data_processor.samples_after_marker):
-            old_marker = self.pending_markers_to_process.popleft()
-            print(f"  Pruned old unprocessable marker: '{old_marker['description']}' (stream pos: {old_marker['stream_pos']})")
-
+                    erd_db_value = float(erd_results_db) if hasattr(erd_results_db, 'item') else erd_results_db
+
+            data_to_send = {
+                "timestamp": time.time(),
+                "marker_description": description,
+                "marker_stream_pos": int(marker_stream_pos),
+                "erd_percent": erd_data,
+                "erd_db": erd_db_value,
+                "channel_names": self.config.FOCUS_CHANNEL_NAMES
+            }
+            self.broadcaster.broadcast_data(data_to_send)
+        else:
+            print(f"       ERD calculation for '{description}' failed or resulted in None.")
 
     def _cleanup(self):
         """
-        Disconnects from EEG source, closes broadcaster, saves data, and creates MNE Raw object.
+        Disconnects from EEG source, closes broadcaster, saves data, and creates MNE Raw object if configured.
         """
         print("\nDisconnecting and saving data...")
         self.receiver.disconnect()
+        # Let the ERD worker finish the queued epochs before the broadcaster closes
+        if self._erd_thread is not None and self._erd_thread.is_alive():
+            self._erd_q.put(None)
+            self._erd_thread.join(timeout=5.0)
         self.broadcaster.close()
 
         # Use custom filename if provided, otherwise use default timestamp
-        import os
         os.makedirs("eeg_data", exist_ok=True)
         os.makedirs("eeg_markers", exist_ok=True)
         eeg_filename = f"./eeg_data/{self.file_base_name}.npy" if self.file_base_name else None
         markers_filename = f"./eeg_markers/{self.file_base_name}.csv" if self.file_base_name else None
         
-        final_eeg_data = self.data_saver.save_eeg_data(self.all_eeg_data, eeg_filename)
+        final_eeg_data = None
+        if self.eeg_stream_file is not None:
+            self.eeg_stream_file.close()
+            final_eeg_data = self.data_saver.save_streamed_eeg_data(self.eeg_stream_path, self.receiver.channel_count, eeg_filename)
         self.data_saver.save_markers(self.all_markers, markers_filename)
-        self.data_saver.create_mne_raw(final_eeg_data, self.receiver.sampling_frequency, self.receiver.channel_names)
+        if self.config.CREATE_MNE_RAW:
+            self.data_saver.create_mne_raw(final_eeg_data, self.receiver.sampling_frequency, self.receiver.channel_names)
         print("Cleanup complete.")
 
 if __name__ == "__main__":
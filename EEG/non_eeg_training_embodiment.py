@@ -1,12 +1,11 @@
 import pygame
 import random
-import time
 import sys
 import json
 
 from utils.trial_generator import TrialGenerator
 from utils.pygame_display import PygameDisplay
-from utils.logger import TrialDataLogger
+from utils.logger import TrialDataLogger, TrialRecord
 from embodiment.EmbodimentExerciseGrasp import EmbodimentExerciseGrasp
 import platform
 import subprocess
@@ -217,7 +216,7 @@ class Experiment:
         self.data_logger = TrialDataLogger({
             "data_folder": "non_eeg_training",
             "fixed_filename": f"{file_base_name}.csv",
-            "fieldnames": ["block", "trial_in_block", "global_trial_num", "condition", "category", "trial_type", "timestamp"]
+            "fieldnames": TrialRecord._fields
         })
         # ERD-related components removed for non-EEG training
 
@@ -375,15 +374,15 @@ class Experiment:
                 presented_condition = self.run_motor_execution_trial(global_trial_num, condition)
                 
                 # Log motor execution trial data
-                self.data_logger.add_trial_data({
-                    "block": block_num,
-                    "trial_in_block": trial_index,
-                    "global_trial_num": global_trial_num,
-                    "condition": presented_condition,
-                    "category": self.trial_generator.get_condition_category(presented_condition),
-                    "trial_type": "motor_execution",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                })
+                self.data_logger.add_trial_data(TrialRecord(
+                    block_num,
+                    trial_index,
+                    global_trial_num,
+                    presented_condition,
+                    self.trial_generator.get_condition_category(presented_condition),
+                    "motor_execution",
+                    self.data_logger.elapsed_ns()
+                ))
                 
                 self.display.display_blank_screen(self.config.SHORT_BREAK_DURATION_MS)
 
@@ -399,15 +398,15 @@ class Experiment:
                 presented_condition = self.run_trial(global_trial_num, condition)
                 
                 # Log trial data (no feedback breaks for natural flow)
-                self.data_logger.add_trial_data({
-                    "block": block_num,
-                    "trial_in_block": trial_index,
-                    "global_trial_num": global_trial_num,
-                    "condition": presented_condition,
-                    "category": self.trial_generator.get_condition_category(presented_condition),
-                    "trial_type": "motor_imagery",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                })
+                self.data_logger.add_trial_data(TrialRecord(
+                    block_num,
+                    trial_index,
+                    global_trial_num,
+                    presented_condition,
+                    self.trial_generator.get_condition_category(presented_condition),
+                    "motor_imagery",
+                    self.data_logger.elapsed_ns()
+                ))
                 
                 print(f"Trial {global_trial_num} completed: {presented_condition} (Non-EEG training)")
                 # No artificial breaks - let trials flow naturally
@@ -432,6 +431,8 @@ class Experiment:
         Displays a break/timer screen between blocks, or a completion message at the end.
         """
         if block_num < self.config.NUM_BLOCKS:
+            # Write this block's rows to disk while the participant rests
+            self.data_logger.flush_async()
             msg = f"End of Block {block_num}.\n\nTake a break."
             self.display.display_timer_with_message(msg, self.config.LONG_BREAK_DURATION_MS)
             msg = "Press any key to continue to the next block."
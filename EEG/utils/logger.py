@@ -1,26 +1,59 @@
 import os
 import csv
 import time
+import threading
+import queue
+from datetime import datetime
 from typing import Optional
+from collections import namedtuple
 
 # --- logger.py: Data and Event Logging Utilities ---
 
+# Fixed-field trial row; being a tuple, it is written by csv.writer directly
+TrialRecord = namedtuple("TrialRecord", "block trial_in_block global_trial_num condition category trial_type t_ns")
+
+
 class TrialDataLogger:
     """
     Collects and saves structured trial-by-trial data to CSV files.
     Configurable fieldnames and filenames. Used for experiment data logging.
+    Rows are buffered in memory as tuples (in fieldnames order) and written either
+    in the background via flush_async() during breaks, or at the end via save_data().
+    If the fieldnames include "t_ns" (monotonic ns from elapsed_ns()), a human-readable
+    "timestamp" column is derived from it at write time.
     """
     def __init__(self, config):
         self.config = config
-        self.all_trial_data = []
+        self.fieldnames = self.config.get(
+            "fieldnames",
+            ["participant_id", "block", "trial_in_block", "global_trial_num", "condition", "category", "timestamp"]
+        )
+        self.all_trial_data = []  # Rows not yet written to disk
+        self._rows_written = 0
+        self._filepath = None
+        self._flush_thread = None
+        self._failed_rows = None  # Rows of a failed background write, put back by _join_flush
+        # Wall-clock anchor for converting monotonic t_ns values back to timestamps
+        self._t0_wall = time.time()
+        self._t0_perf_ns = time.perf_counter_ns()
+        self._t_ns_index = self.fieldnames.index("t_ns") if "t_ns" in self.fieldnames else None
+
+    def elapsed_ns(self):
+        # Monotonic nanoseconds since the logger was created
+        return time.perf_counter_ns() - self._t0_perf_ns
+
+    def _format_timestamp(self, t_ns):
+        return datetime.fromtimestamp(self._t0_wall + t_ns * 1e-9).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
 
     def add_trial_data(self, data):
+        # Store rows as tuples; dicts keyed by fieldname are still accepted
+        if isinstance(data, dict):
+            data = tuple(data.get(field, "") for field in self.fieldnames)
         self.all_trial_data.append(data)
 
-    def save_data(self, participant_id):
-        if not self.all_trial_data:
-            print("No trial data to save.")
-            return None
+    def _resolve_filepath(self, participant_id):
+        if self._filepath is not None:
+            return self._filepath
 
         # Get folder and filename format from config
         data_folder = self.config.get("data_folder", "data")
@@ -39,18 +72,79 @@ class TrialDataLogger:
         else:
             timestamp_str = time.strftime("%Y%m%d_%H%M%S")
             filename = filename_template.format(participant_id=participant_id, timestamp=timestamp_str)
-        filepath = os.path.join(data_folder, filename)
+        self._filepath = os.path.join(data_folder, filename)
+        return self._filepath
+
+    def _write_rows(self, rows):
+        # The first write creates the file with its header, later writes append
+        mode = 'w' if self._rows_written == 0 else 'a'
+        start_size = os.path.getsize(self._filepath) if mode == 'a' and os.path.exists(self._filepath) else 0
+        try:
+            with open(self._filepath, mode, newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                if self._t_ns_index is None:
+                    if mode == 'w':
+                        writer.writerow(self.fieldnames)
+                    writer.writerows(rows)
+                else:
+                    if mode == 'w':
+                        writer.writerow(list(self.fieldnames) + ["timestamp"])
+                    t_ns_index = self._t_ns_index
+                    writer.writerows((*row, self._format_timestamp(row[t_ns_index])) for row in rows)
+        except Exception:
+            # Cut off whatever part of the rows made it to the file, so they can all be
+            # written again without duplicates
+            try:
+                with open(self._filepath, 'r+b') as csvfile:
+                    csvfile.truncate(start_size)
+            except OSError:
+                pass
+            raise
+        self._rows_written += len(rows)
+
+    def _write_rows_in_background(self, rows):
+        try:
+            self._write_rows(rows)
+        except Exception as e:
+            # Handed back to the main thread, which puts them ahead of any newer rows
+            self._failed_rows = rows
+            print(f"Error: Could not write trial data to {self._filepath}. Error: {e}")
+
+    def _join_flush(self):
+        # Wait for the background write; the rows of a failed one are queued again
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+        if self._failed_rows:
+            self.all_trial_data[:0] = self._failed_rows
+            self._failed_rows = None
+
+    def flush_async(self, participant_id=None):
+        """
+        Write the buffered rows on a background thread. Meant to be called at the start
+        of a long break so disk I/O never lands inside the timed trial sequence.
+        """
+        self._join_flush()
+        if not self.all_trial_data:
+            return
+        rows, self.all_trial_data = self.all_trial_data, []
+        self._resolve_filepath(participant_id)
+        self._flush_thread = threading.Thread(target=self._write_rows_in_background, args=(rows,), daemon=True)
+        self._flush_thread.start()
+
+    def save_data(self, participant_id):
+        self._join_flush()
+
+        if not self.all_trial_data and self._rows_written == 0:
+            print("No trial data to save.")
+            return None
+
+        filepath = self._resolve_filepath(participant_id)
 
         # Write CSV
         try:
-            fieldnames = self.config.get(
-                "fieldnames",
-                ["participant_id", "block", "trial_in_block", "global_trial_num", "condition", "category", "timestamp"]
-            )
-            with open(filepath, 'w', newline='') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.all_trial_data)
+            self._write_rows(self.all_trial_data)
+            self.all_trial_data = []
             print(f"Data saved to {filepath}")
             return filepath
         except IOError as e:
@@ -58,7 +152,6 @@ class TrialDataLogger:
             return None
 
 
-
 class TextLogger:
     """
     A simple class to log unstructured text messages to a file.
@@ -122,6 +215,69 @@ class TextLogger:
             print(f"Error: Could not write to log file {self.filepath}. Details: {e}")
 
 
+class BufferedTextLogger(TextLogger):
+    """
+    TextLogger variant whose log() only enqueues the message; a daemon thread writes
+    the queued lines to the file (flushing every `flush_every` lines or whenever the
+    queue runs empty) and optionally echoes them to stdout. Use this where logging
+    happens on a timing-critical path. Call close() to drain the queue on shutdown.
+
+    Args:
+        flush_every (int): Maximum number of lines written between file flushes.
+        Other arguments are as for TextLogger.
+    """
+    def __init__(self, log_dir: str = "logs", filename: str = "log.txt", timestamp_format: Optional[str] = None, add_timestamp_to_filename: bool = True, flush_every: int = 100):
+        super().__init__(log_dir, filename, timestamp_format, add_timestamp_to_filename)
+        self.flush_every = flush_every
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def log(self, message: str, echo: bool = False):
+        """
+        Queues a message for the log file; if echo is True it is also printed to stdout
+        by the writer thread. The time is captured here, so timestamps reflect when the
+        event happened rather than when it was written.
+        """
+        self._queue.put((time.time(), message, echo))
+
+    def _drain(self):
+        try:
+            f = open(self.filepath, 'a', encoding='utf-8')
+        except IOError as e:
+            print(f"Error: Could not write to log file {self.filepath}. Details: {e}")
+            f = None
+        pending = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            message_time, message, echo = item
+            if echo:
+                print(message)
+            if f is None:
+                continue
+            log_entry = ""
+            if self.timestamp_format:
+                log_entry += f"[{time.strftime(self.timestamp_format, time.localtime(message_time))}] "
+            log_entry += message
+            f.write(log_entry + '\n')
+            pending += 1
+            if pending >= self.flush_every or self._queue.empty():
+                f.flush()
+                pending = 0
+        if f is not None:
+            f.close()
+
+    def close(self):
+        """
+        Writes out all queued messages and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
 class ERDLogger:
     """
     A specialized logger for ERD values during training sessions.
@@ -24,6 +24,8 @@ class PygameDisplay:
         self.FONT_SMALL = pygame.font.Font(None, 36)
         # Dictionary to hold loaded and scaled images
         self.scaled_images = {}
+        # Centered destination rects of surfaces prepared by prepare_stimulus_surface
+        self._centered_rects = {}
         
 
     def _setup_screen(self):
@@ -277,6 +279,16 @@ class PygameDisplay:
             if pygame.time.get_ticks() - start_time >= duration_ms: running = False
             pygame.time.wait(10)
 
+    def prepare_stimulus_surface(self, image_surface, crop_rect=None):
+        # Crop once and convert to the display pixel format so display_image_stimulus
+        # can blit it directly without building a new surface on every call
+        if crop_rect is not None:
+            image_surface = image_surface.subsurface(pygame.Rect(crop_rect).clip(image_surface.get_rect()))
+        prepared = image_surface.convert_alpha()
+        # The blit position never changes, so compute it once too
+        self._centered_rects[prepared] = prepared.get_rect(center=self.screen.get_rect().center)
+        return prepared
+
     def display_image_stimulus(self, image_surface, duration_ms, crop_rect=None):
         # Display an image (optionally cropped) centered on the screen for duration_ms milliseconds
         self.screen.fill(self.config.BLACK)
@@ -294,8 +306,10 @@ class PygameDisplay:
             image_to_display = image_surface
 
 
-        screen_center = self.screen.get_rect().center
-        image_rect = image_to_display.get_rect(center=screen_center)
+        image_rect = self._centered_rects.get(image_to_display)
+        if image_rect is None:
+            screen_center = self.screen.get_rect().center
+            image_rect = image_to_display.get_rect(center=screen_center)
         
         self.screen.blit(image_to_display, image_rect)
 
@@ -1,5 +1,7 @@
 import serial
 import time
+import os
+import sys
 
 # --- serial_communication.py: Serial Port Trigger Utility ---
 class SerialCommunication:
@@ -16,6 +18,7 @@ class SerialCommunication:
         try:
             self.ser = serial.Serial(self.port, self.baudrate, timeout=0.01)
             print(f"Serial port {self.port} opened successfully at {self.baudrate} baud.")
+            self.set_low_latency_mode()
             time.sleep(0.1)
         except serial.SerialException as e:
             print(f"Error: Could not open serial port {self.port}. {e}")
@@ -25,18 +28,57 @@ class SerialCommunication:
             print(f"An unexpected error occurred during serial port initialization: {e}")
             self.ser = None
 
-    def send_trigger(self, trigger_value):
+    def set_low_latency_mode(self):
+        """
+        Reduce USB-serial latency on Linux: set the FTDI latency timer to 1 ms and
+        enable ASYNC_LOW_LATENCY on the open port. Silently skipped elsewhere or
+        when permissions do not allow it.
+        """
+        if not sys.platform.startswith("linux") or not self.ser:
+            return
+        latency_timer = f"/sys/bus/usb-serial/devices/{os.path.basename(self.port)}/latency_timer"
+        try:
+            with open(latency_timer, "w") as f:
+                f.write("1")
+            print(f"Set {latency_timer} to 1 ms.")
+        except OSError as e:
+            print(f"Could not set USB latency timer ({e}).")
+        try:
+            # pyserial issues the TIOCGSERIAL/TIOCSSERIAL ioctls for ASYNC_LOW_LATENCY
+            self.ser.set_low_latency_mode(True)
+        except (AttributeError, OSError, ValueError) as e:
+            print(f"Could not enable ASYNC_LOW_LATENCY on {self.port} ({e}).")
+
+    def _raw_write(self, payload):
+        """
+        Write raw bytes to the port without logging or pacing.
+        Returns True if the write was issued.
+        """
         if self.ser and self.ser.is_open:
-            try:
-                # message_to_send = str(trigger_value).encode('ascii')
-                # self.ser.write(bytes([trigger_value]))
-                self.ser.write(trigger_value.to_bytes(length=1, byteorder="big"))
-                print(f"Sent trigger: {trigger_value} (0x{trigger_value:02X})")
+            self.ser.write(payload)
+            return True
+        return False
+
+    def send_trigger(self, trigger_value):
+        # message_to_send = str(trigger_value).encode('ascii')
+        # self.ser.write(bytes([trigger_value]))
+        try:
+            payload = trigger_value.to_bytes(length=1, byteorder="big")
+        except (AttributeError, OverflowError) as e:
+            print(f"Error sending trigger {trigger_value}: {e}")
+            return
+        self.send_trigger_bytes(payload)
+
+    def send_trigger_bytes(self, payload):
+        # Fast path for a prebuilt single-byte payload (e.g. bytes([code])), no conversion
+        try:
+            if self._raw_write(payload):
+                print(f"Sent trigger: {payload[0]} (0x{payload[0]:02X})")
                 time.sleep(0.001)
-            except serial.SerialTimeoutException:
-                print(f"Serial port timeout when sending trigger {trigger_value}.")
-            except Exception as e:
-                print(f"Error sending trigger {trigger_value}: {e}")
+        except serial.SerialTimeoutException:
+            print(f"Serial port timeout when sending trigger {payload[0]}.")
+        except Exception as e:
+            print(f"Error sending trigger {payload[0]}: {e}")
 
     def close(self):
         if self.ser and self.ser.is_open:
@@ -1,4 +1,6 @@
 import random
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 # --- trial_generator.py: Trial List Generation Utility ---
 class TrialGenerator:
@@ -9,6 +11,7 @@ class TrialGenerator:
     """
     def __init__(self, config):
         self.config = config
+        self.rng = np.random.default_rng()
 
     def get_condition_category(self, condition_name):
         if condition_name == "sixth":
@@ -37,7 +40,7 @@ class TrialGenerator:
                 return True
         return False
 
-    def generate_trial_list_for_block(self):
+    def _build_base_trial_conditions(self):
         base_trial_conditions = []
         base_trial_conditions.extend(["sixth"] * self.config.NUM_SIXTH_FINGER_TRIALS_PER_BLOCK)
         finger_types = self.config.NORMAL_FINGER_TYPES if self.config.NUM_NORMAL_FINGERS == 5 else random.sample(self.config.NORMAL_FINGER_TYPES, self.config.NUM_NORMAL_FINGERS)
@@ -49,14 +52,39 @@ class TrialGenerator:
         base_trial_conditions.extend([self.config.BLANK_CONDITION_NAME] * self.config.NUM_BLANK_TRIALS_PER_BLOCK)
         
         
-        shuffled_list = list(base_trial_conditions)
-        ctr=1
+        return base_trial_conditions
+
+    def _find_valid_permutation(self, base_trial_conditions, batch_size):
+        # Rejection sampling, batch_size shuffles at a time: shuffle an index array per row,
+        # map it to category codes and reject rows containing a sixth/blank streak longer
+        # than MAX_CONSECUTIVE_CATEGORY_STREAK (normal fingers never form a streak).
+        max_streak = self.config.MAX_CONSECUTIVE_CATEGORY_STREAK
+        category_codes = {self.config.CATEGORY_NORMAL: 0, self.config.CATEGORY_SIXTH: 1, self.config.CATEGORY_BLANK: 2}
+        category_lut = np.array([category_codes.get(self.get_condition_category(c), 0) for c in base_trial_conditions], dtype=np.int8)
+        num_trials = len(base_trial_conditions)
+        base_rows = np.tile(np.arange(num_trials, dtype=np.int8 if num_trials < 128 else np.int16), (batch_size, 1))
+        ctr = 0
         while True:
-            random.shuffle(shuffled_list)
-            ctr+=1
-            if not self._check_streak_violations(shuffled_list, self.config.MAX_CONSECUTIVE_CATEGORY_STREAK):
-                print(f"Generated trial list after {ctr} trials")
-                return shuffled_list
+            perms = self.rng.permuted(base_rows, axis=1)
+            ctr += batch_size
+            if max_streak >= num_trials:
+                valid = np.ones(batch_size, dtype=bool)
+            else:
+                cats = category_lut[perms]
+                repeats = (cats[:, 1:] == cats[:, :-1]) & (cats[:, 1:] != 0)
+                # A streak longer than max_streak contains max_streak consecutive repeats
+                valid = ~sliding_window_view(repeats, max_streak, axis=1).all(axis=2).any(axis=1)
+            hits = np.flatnonzero(valid)
+            if hits.size:
+                print(f"Generated trial list after {ctr - batch_size + hits[0] + 1} trials")
+                return [base_trial_conditions[i] for i in perms[hits[0]]]
+
+    def generate_trial_list_for_block(self, batch_size=65536):
+        return self._find_valid_permutation(self._build_base_trial_conditions(), batch_size)
+
+    def generate_trial_lists(self, num_blocks, batch_size=65536):
+        # Generate the trial lists for all blocks up front so no block starts with a generation stall
+        return [self.generate_trial_list_for_block(batch_size) for _ in range(num_blocks)]
     #         
     # def generate_trial_list_for_block(self):
     #     finger_types = self.config.NORMAL_FINGER_TYPES if self.config.NUM_NORMAL_FINGERS == 5 else random.sample(self.config.NORMAL_FINGER_TYPES, self.config.NUM_NORMAL_FINGERS)